@@ -0,0 +1,326 @@
+"""Headless render benchmark for dashboard.py built on Streamlit's AppTest.
+
+Runs a fixed set of interaction scenarios, records script wall time, figures
+built, serialized element bytes and peak Python memory for each, and compares
+them with benchmark_baseline.json. Any metric above its baseline tolerance is a
+regression and makes the run exit non-zero, as does an app module whose import
+time in a fresh interpreter exceeds its budget in IMPORT_BUDGETS_MS. Also
+reports the time to serialize one subdivision chart of each type, through
+st.plotly_chart's path versus figure_json's.
+
+    python benchmark.py                    # compare against the baseline
+    python benchmark.py --update-baseline  # record a new baseline
+    python benchmark.py --source synthetic:100x24x20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Allowed growth over the baseline before a metric counts as a regression
+TOLERANCES = {
+    'time_ms': 0.5,
+    'figures': 0.0,
+    'element_bytes': 0.1,
+    'peak_kb': 0.25,
+}
+
+# Import-time budgets in ms for the modules dashboard.py imports, each measured on
+# top of streamlit (which every run pays for regardless) and the modules listed
+# before it. kpi_data carries the data stack (pandas, numpy), so figure_json is
+# measured after it; charts must stay free of Plotly until a figure is built.
+IMPORT_BUDGETS_MS = {
+    'kpi_registry': 10,
+    'instrumentation': 10,
+    'profiling': 20,
+    'figure_cache': 10,
+    'charts': 20,
+    'kpi_data': 800,
+    'figure_json': 20,
+    'total': 900,
+}
+
+IMPORT_SCRIPT = """
+import json, sys, time
+import streamlit
+timings = {}
+for name in sys.argv[1:]:
+    start = time.perf_counter()
+    __import__(name)
+    timings[name] = (time.perf_counter() - start) * 1000
+print(json.dumps(timings))
+"""
+
+def measure_imports(repeat):
+    """Median import time per budgeted module, each in import order in a fresh interpreter"""
+    modules = [name for name in IMPORT_BUDGETS_MS if name != 'total']
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT, *modules], check=True,
+                                capture_output=True, text=True, cwd=os.path.dirname(APP)).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    timings = {name: round(statistics.median(run[name] for run in runs), 1) for name in modules}
+    timings['total'] = round(sum(timings.values()), 1)
+    return timings
+
+def over_budget(timings):
+    return [f"import {name}: {ms} ms > {IMPORT_BUDGETS_MS[name]} ms budget"
+            for name, ms in timings.items() if ms > IMPORT_BUDGETS_MS[name]]
+
+def measure_encoding(repeat, number=200):
+    """Median µs to serialize one subdivision chart per chart type, by path
+
+    plotly: what st.plotly_chart does with a figure on every call (to_dict, then
+    plotly.io.to_json); encoded: figure_json.encode_figure of the same figure;
+    template: subdivision_spec filling its chart type's template, build included.
+    """
+    import plotly.io
+
+    from charts import build_subdivision_chart, subdivision_spec
+    from figure_json import encode_figure
+    from kpi_data import build_kpi_store
+
+    store = build_kpi_store()
+    month = store.months[-1]
+    data = next(record.subdivisions for kpi in store.kpis
+                if (record := store.kpi(store.bus[0], month, kpi)).subdivisions)
+
+    def median_us(run):
+        return round(statistics.median(timeit.repeat(run, number=number, repeat=repeat)) / number * 1e6, 1)
+
+    results = {}
+    for chart_type in ('bar', 'pie', 'line'):
+        figure = build_subdivision_chart('Benchmark', data, chart_type)
+        subdivision_spec('Benchmark', data, chart_type)
+        results[chart_type] = {
+            'plotly_us': median_us(lambda: plotly.io.to_json(figure.to_dict(), validate=False)),
+            'encoded_us': median_us(lambda: encode_figure(figure)),
+            'template_us': median_us(lambda: subdivision_spec('Benchmark', data, chart_type)),
+        }
+    return results
+
+class FigureCounter:
+    """Counts Plotly figure constructions while installed"""
+
+    def __init__(self):
+        import plotly.basedatatypes
+        self._cls = plotly.basedatatypes.BaseFigure
+        self._init = self._cls.__init__
+        self.count = 0
+
+    def __enter__(self):
+        original = self._init
+
+        def counting_init(figure, *args, **kwargs):
+            self.count += 1
+            return original(figure, *args, **kwargs)
+
+        self._cls.__init__ = counting_init
+        return self
+
+    def __exit__(self, *exc):
+        self._cls.__init__ = self._init
+
+def share_script_bytecode():
+    """Compile the script once per process, as a real server does, instead of on every AppTest run
+
+    Otherwise every run pays for parsing and compiling dashboard.py, and time and
+    peak memory track the script's size rather than the work it does.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    compiled = {}
+    get_bytecode = ScriptCache.get_bytecode
+
+    def shared_get_bytecode(cache, script_path):
+        key = (script_path, os.stat(script_path).st_mtime_ns)
+        if key not in compiled:
+            compiled[key] = get_bytecode(cache, script_path)
+        return compiled[key]
+
+    ScriptCache.get_bytecode = shared_get_bytecode
+
+def element_bytes(app):
+    """Total serialized size of the element protos the run produced"""
+    total = 0
+    stack = [app._tree]
+    while stack:
+        node = stack.pop()
+        proto = getattr(node, 'proto', None)
+        if proto is not None and hasattr(proto, 'ByteSize'):
+            total += proto.ByteSize()
+        stack.extend(getattr(node, 'children', {}).values())
+    return total
+
+def clear_caches():
+    import streamlit as st
+
+    import charts
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    # Chart templates are process-wide too; a cold start builds them again
+    charts._subdivision_templates.clear()
+
+def new_app(timeout):
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(APP, default_timeout=timeout)
+
+# Each scenario is (setup, action): setup(timeout) returns an AppTest in the
+# starting state, action(app) performs the measured run on it. Interaction
+# scenarios start from a cold process so their figure counts stay meaningful.
+def setup_cold(timeout):
+    clear_caches()
+    return new_app(timeout)
+
+def setup_session(timeout):
+    return setup_cold(timeout).run()
+
+def run_plain(app):
+    app.run()
+
+def switch_bu(app):
+    options = app.radio(key='bu').options
+    app.radio(key='bu').set_value(options[-1]).run()
+
+def switch_month(app):
+    options = app.selectbox(key='month').options
+    app.selectbox(key='month').set_value(options[-1]).run()
+
+def setup_history_session(timeout):
+    """Session on the latest month: its drill-down tabs have a full history to chart"""
+    from kpi_data import build_kpi_store
+    app = setup_cold(timeout)
+    app.session_state['month'] = build_kpi_store().months[-1]
+    return app.run()
+
+def open_expander(app):
+    app.session_state['exp_revenue'] = True
+    app.run()
+
+def setup_uptime_open(timeout):
+    app = setup_cold(timeout)
+    app.session_state['exp_system_uptime'] = True
+    return app.run()
+
+def change_chart_type(app):
+    app.session_state['exp_system_uptime'] = True
+    app.selectbox(key='uptime_chart').set_value('pie').run()
+
+def switch_to_matrix(app):
+    app.segmented_control(key='layout').set_value('Matrix').run()
+
+SCENARIOS = {
+    'cold_start': (setup_cold, run_plain),
+    'warm_session_start': (lambda timeout: new_app(timeout), run_plain),
+    'bu_switch': (setup_session, switch_bu),
+    'month_switch': (setup_session, switch_month),
+    'expander_open': (setup_history_session, open_expander),
+    'chart_type_change': (setup_uptime_open, change_chart_type),
+    'matrix_layout': (setup_session, switch_to_matrix),
+}
+
+def measure(name, repeat, timeout):
+    """Median wall time over repeat runs, plus figures/bytes/peak memory from one more run"""
+    setup, action = SCENARIOS[name]
+    times = []
+    for _ in range(repeat):
+        app = setup(timeout)
+        start = time.perf_counter()
+        action(app)
+        times.append((time.perf_counter() - start) * 1000)
+        if app.exception:
+            raise RuntimeError(f"{name}: {app.exception[0].message}")
+    app = setup(timeout)
+    tracemalloc.start()
+    with FigureCounter() as figures:
+        action(app)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'time_ms': round(statistics.median(times), 1),
+        'figures': figures.count,
+        'element_bytes': element_bytes(app),
+        'peak_kb': round(peak / 1024),
+    }
+
+def compare(results, baseline):
+    """List of regression messages for metrics above baseline * (1 + tolerance)"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if reference is None:
+                continue
+            limit = reference * (1 + TOLERANCES[metric])
+            if value > limit:
+                regressions.append(f"{name}.{metric}: {value} > {reference} (+{TOLERANCES[metric]:.0%})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Run only this scenario (repeatable)")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per scenario")
+    parser.add_argument('--timeout', type=float, default=120, help="AppTest run timeout in seconds")
+    parser.add_argument('--source', help="KPI_SOURCE to benchmark against, e.g. synthetic:100x24x20")
+    parser.add_argument('--baseline', default=BASELINE, help="Baseline JSON path")
+    parser.add_argument('--update-baseline', action='store_true', help="Write results as the new baseline")
+    parser.add_argument('--output', help="Also write the results as JSON to this path")
+    parser.add_argument('--skip-imports', action='store_true', help="Skip the import-time budget check")
+    parser.add_argument('--skip-encoding', action='store_true', help="Skip the chart serialization timings")
+    args = parser.parse_args(argv)
+
+    # Must be set before the app (and kpi_data) is first imported
+    if args.source:
+        os.environ['KPI_SOURCE'] = args.source
+
+    budget_failures = []
+    if not args.skip_imports:
+        timings = measure_imports(args.repeat)
+        print(f"{'imports':20} " + "  ".join(f"{k}={v}" for k, v in timings.items()))
+        budget_failures = over_budget(timings)
+
+    if not args.skip_encoding:
+        for chart_type, timings in measure_encoding(args.repeat).items():
+            print(f"{'encode_' + chart_type:20} " + "  ".join(f"{k}={v}" for k, v in timings.items()))
+
+    share_script_bytecode()
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = measure(name, args.repeat, args.timeout)
+        print(f"{name:20} " + "  ".join(f"{k}={v}" for k, v in results[name].items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f))
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    for message in budget_failures:
+        print(f"OVER BUDGET {message}")
+    return 1 if regressions or budget_failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Plotly figure builders and metric formatting shared by the dashboard and the static export
+
+Plotly is imported inside the builders: plotly.express alone costs over 100 ms of
+import time, and a process that serves only metric tiles never needs it.
+
+Long series are downsampled to about one point per pixel of CHART_WIDTH before
+they reach a figure (LTTB for lines, min/max buckets for bars), and line traces
+switch to WebGL above WEBGL_POINTS, so payloads and browser render time stay
+bounded however long the history gets.
+"""
+import math
+import os
+
+from kpi_registry import KPIS_BY_LABEL, delta_color, format_value
+
+# Chart width in pixels that downsampling targets: about one point per pixel
+CHART_WIDTH = int(os.environ.get("KPI_CHART_WIDTH", "800"))
+# Points in one figure above which line traces render with WebGL (Scattergl) instead of SVG
+WEBGL_POINTS = int(os.environ.get("KPI_WEBGL_POINTS", "1000"))
+# Series up to this length keep their point markers
+MARKER_POINTS = 100
+
+def downsample(labels, values, chart_type="line", width=CHART_WIDTH, x=None):
+    """(labels, values) cut down to about width points, or unchanged when already short
+
+    x gives numeric positions for LTTB (e.g. timestamps); by default points are evenly spaced.
+    """
+    if len(values) <= width:
+        return list(labels), list(values)
+    from downsample import lttb, min_max
+
+    index = min_max(values, width) if chart_type == "bar" else lttb(values, width, x)
+    return [labels[i] for i in index], [values[i] for i in index]
+
+def metric_fields(title, value, unit, change, icon="📊"):
+    """st.metric keyword arguments for a KPI tile"""
+    kpi = KPIS_BY_LABEL.get(title)
+    formatter = kpi.formatter if kpi is not None and kpi.formatter else format_value
+    direction = kpi.direction if kpi is not None else None
+    return {
+        'label': f"{icon} {title}",
+        'value': formatter(value, unit),
+        'delta': None if change is None else f"{change:+}%",
+        'delta_color': delta_color(direction, change or 0),
+    }
+
+def subdivision_title(kpi_name, chart_type="bar"):
+    if chart_type == "bar":
+        return f"{kpi_name} by Subdivision"
+    if chart_type == "pie":
+        return f"{kpi_name} Distribution by Subdivision"
+    return f"{kpi_name} Trend by Subdivision"
+
+def build_subdivision_chart(kpi_name, subdivision_data, chart_type="bar", width=CHART_WIDTH):
+    """Build the Plotly figure for subdivision data (or a trend keyed by period)"""
+    import plotly.express as px
+
+    subdivisions = list(subdivision_data.keys())
+    values = list(subdivision_data.values())
+    if chart_type != "pie":
+        subdivisions, values = downsample(subdivisions, values, chart_type, width)
+    title = subdivision_title(kpi_name, chart_type)
+    if chart_type == "bar":
+        fig = px.bar(
+            x=subdivisions,
+            y=values,
+            title=title,
+            color=values,
+            color_continuous_scale="Blues"
+        )
+    elif chart_type == "pie":
+        fig = px.pie(
+            values=values,
+            names=subdivisions,
+            title=title
+        )
+    else:  # line chart
+        fig = px.line(
+            x=subdivisions,
+            y=values,
+            title=title,
+            markers=len(values) <= MARKER_POINTS,
+            render_mode='webgl' if len(values) > WEBGL_POINTS else 'svg'
+        )
+    fig.update_layout(
+        height=400,
+        showlegend=True if chart_type == "pie" else False
+    )
+    return fig
+
+# Parts of a subdivision chart's spec that depend on its data, per chart type (see subdivision_spec)
+SUBDIVISION_FIELDS = {
+    'bar': (('data', 0, 'x'), ('data', 0, 'y'), ('data', 0, 'marker', 'color'), ('layout', 'title', 'text')),
+    'pie': (('data', 0, 'labels'), ('data', 0, 'values'), ('layout', 'title', 'text')),
+    'line': (('data', 0, 'x'), ('data', 0, 'y'), ('layout', 'title', 'text')),
+}
+
+_subdivision_templates = {}
+
+def subdivision_spec(kpi_name, subdivision_data, chart_type="bar", width=CHART_WIDTH):
+    """build_subdivision_chart's figure, encoded (a figure_json.EncodedFigure)
+
+    The first chart of each kind is built with Plotly and becomes a template;
+    later ones only encode their own labels, values and title.
+    """
+    import numpy as np
+
+    from figure_json import FigureTemplate
+
+    subdivisions = list(subdivision_data.keys())
+    values = list(subdivision_data.values())
+    if chart_type != "pie":
+        subdivisions, values = downsample(subdivisions, values, chart_type, width)
+    values = np.asarray(values)
+    kind = chart_type if chart_type in ("bar", "pie") else "line"
+    # Line charts drop markers and switch to WebGL with length, each a different template
+    variant = (kind, len(values) <= MARKER_POINTS, len(values) > WEBGL_POINTS) if kind == "line" else (kind,)
+    template = _subdivision_templates.get(variant)
+    if template is None:
+        fig = build_subdivision_chart(kpi_name, dict(zip(subdivisions, values.tolist())), chart_type, width)
+        template = _subdivision_templates[variant] = FigureTemplate(fig, SUBDIVISION_FIELDS[kind])
+    title = subdivision_title(kpi_name, chart_type)
+    if kind == "bar":
+        return template.fill(subdivisions, values, values, title)
+    return template.fill(subdivisions, values, title)
+
+def build_radar_chart(bu, metrics, scores):
+    """Build the radar figure for one BU's normalized scores"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=scores,
+        theta=metrics,
+        fill='toself',
+        name=f'{bu} Performance',
+        line_color='#4472C4',
+        fillcolor='rgba(68, 114, 196, 0.3)'
+    ))
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100]
+            )),
+        showlegend=True,
+        title="Performance Overview",
+        height=350
+    )
+    return fig
+
+def build_radar_comparison(metrics, traces):
+    """Build a radar figure with one trace per (name, scores) pair"""
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+
+    fig = go.Figure()
+    colors = qualitative.Plotly
+    # Filled areas stop being readable beyond a handful of overlapping traces
+    fill = 'toself' if len(traces) <= 5 else 'none'
+    for i, (name, scores) in enumerate(traces):
+        fig.add_trace(go.Scatterpolar(
+            r=list(scores),
+            theta=metrics,
+            fill=fill,
+            name=name,
+            line_color=colors[i % len(colors)],
+            opacity=0.7
+        ))
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100]
+            )),
+        showlegend=True,
+        title="Performance Comparison",
+        height=350
+    )
+    return fig
+
+def build_live_chart(kpi_name, times, values, width=CHART_WIDTH):
+    """Build the compact line chart of a KPI's live points (epoch-second times)"""
+    import plotly.graph_objects as go
+
+    if len(values) > width:
+        from downsample import lttb
+
+        index = lttb(values, width, times)
+        times, values = times[index], values[index]
+    trace = go.Scattergl if len(values) > WEBGL_POINTS else go.Scatter
+    fig = go.Figure(trace(
+        x=(times * 1000).astype('datetime64[ms]'),
+        y=values,
+        mode='lines',
+        name=kpi_name,
+        line_color='#4472C4'
+    ))
+    fig.update_layout(
+        height=160,
+        margin=dict(l=10, r=10, t=10, b=10),
+        showlegend=False
+    )
+    return fig
+
+def build_small_multiples(title, frame, chart_type="line", columns=None, width=CHART_WIDTH):
+    """Build one faceted figure with a panel per column of a period x subdivision frame, axes shared"""
+    import plotly.express as px
+
+    # Roughly square grids, at least three panels wide
+    columns = columns or max(3, math.ceil(len(frame.columns) ** 0.5))
+    rows = math.ceil(len(frame.columns) / columns)
+    # Long form, each panel downsampled to its own share of the width
+    data = {'period': [], 'value': [], 'variable': []}
+    for name in frame.columns:
+        series = frame[name].dropna()
+        periods, values = downsample(list(series.index), series.tolist(), chart_type, width // columns)
+        data['period'] += periods
+        data['value'] += values
+        data['variable'] += [name] * len(values)
+    builder = px.bar if chart_type == "bar" else px.line
+    options = {} if chart_type == "bar" else {
+        'markers': len(data['value']) <= MARKER_POINTS * len(frame.columns),
+        'render_mode': 'webgl' if len(data['value']) > WEBGL_POINTS else 'svg',
+    }
+    fig = builder(
+        data,
+        x='period',
+        y='value',
+        facet_col='variable',
+        facet_col_wrap=columns,
+        facet_row_spacing=min(0.08, 0.5 / rows),
+        title=title,
+        **options
+    )
+    # "variable=PRODEV" -> "PRODEV"
+    fig.for_each_annotation(lambda annotation: annotation.update(text=annotation.text.split('=')[-1]))
+    fig.update_xaxes(title_text=None)
+    fig.update_yaxes(title_text=None)
+    fig.update_layout(
+        height=120 + 200 * rows,
+        showlegend=False
+    )
+    return fig
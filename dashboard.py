@@ -1,10 +1,28 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import random
+import os
+
+import instrumentation
+import profiling
+from charts import (build_live_chart, build_radar_chart, build_radar_comparison, build_small_multiples,
+                    metric_fields, subdivision_spec)
+from figure_cache import FigureCache
+from figure_json import encode_figure, st_plotly
+from instrumentation import increment, timed
+from kpi_alerts import BREACH
+from kpi_data import (get_kpi_stream, load_alert_engine, load_kpi_cube, load_kpi_history, load_kpi_store,
+                      load_radar_scores, refresh_kpi_data)
+from kpi_stream import STREAM_REFRESH
+from kpi_matrix import ACROSS_BUS, ACROSS_MONTHS, SHOW_CHANGES, SHOW_VALUES, matrix_data, style_matrix
+from kpi_registry import KPIS, SECTIONS, delta_color
+from kpi_store import TOTAL
+
+# Maximum number of figures kept in the process-wide LRU cache
+FIGURE_CACHE_SIZE = int(os.environ.get("FIGURE_CACHE_SIZE", "512"))
+# Alerts listed as sidebar badges; the alerts panel shows all of them
+SIDEBAR_ALERTS = 6
+# BUs or periods a radar comparison starts with; more can be picked
+RADAR_COMPARE_DEFAULT = 4
 
 # Set page config
 st.set_page_config(
@@ -14,274 +32,382 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize session state
-if 'selected_bu' not in st.session_state:
-    st.session_state.selected_bu = 'BU1'
-if 'selected_month' not in st.session_state:
-    st.session_state.selected_month = 'January'
-
-# Sample data structure for KPIs
-def generate_kpi_data():
-    """Generate sample KPI data for different BUs and subdivisions"""
-    months = ['January', 'February', 'March', 'April', 'May', 'June']
-    bus = ['BU1', 'BU2', 'BU3']
-    subdivisions = ['PRODEV', 'PD1', 'PD2', 'DOCS', 'ITS', 'CHAPTER']
-    kpi_data = {}
-    for bu in bus:
-        kpi_data[bu] = {}
-        for month in months:
-            kpi_data[bu][month] = {
-                'Financial': {
-                    'Revenue': {
-                        'value': random.randint(25, 45) / 10,  # 2.5M - 4.5M
-                        'unit': 'M',
-                        'change': random.randint(-15, 25),
-                        'subdivisions': {sub: random.randint(20, 80) for sub in subdivisions}
-                    },
-                    'Revenue vs Target': {
-                        'value': random.randint(85, 105),
-                        'unit': '%',
-                        'change': random.randint(-5, 15),
-                        'target': 100
-                    },
-                    'Gross Margin': {
-                        'value': random.randint(30, 45),
-                        'unit': '%',
-                        'change': random.randint(-8, 12)
-                    },
-                    'Cost per Project': {
-                        'value': random.randint(35, 55),
-                        'unit': 'K',
-                        'change': random.randint(-20, 10)
-                    },
-                    'AR Days': {
-                        'value': random.randint(25, 40),
-                        'unit': 'days',
-                        'change': random.randint(-10, 15)
-                    }
-                },
-                'Customer & Service': {
-                    'CSAT': {
-                        'value': random.randint(40, 48) / 10,  # 4.0 - 4.8
-                        'unit': '/5',
-                        'change': random.randint(-5, 15),
-                        'subdivisions': {sub: random.randint(35, 50) / 10 for sub in subdivisions}
-                    },
-                    'NPS': {
-                        'value': random.randint(35, 55),
-                        'unit': '',
-                        'change': random.randint(-10, 20)
-                    },
-                    'SLA Achievement': {
-                        'value': random.randint(85, 98),
-                        'unit': '%',
-                        'change': random.randint(-5, 10)
-                    },
-                    'Avg Response Time': {
-                        'value': random.randint(18, 30) / 10,  # 1.8h - 3.0h
-                        'unit': 'h',
-                        'change': random.randint(-25, 5)
-                    },
-                    'Retention Rate': {
-                        'value': random.randint(88, 96),
-                        'unit': '%',
-                        'change': random.randint(-3, 8)
-                    }
-                },
-                'Quality Metrics': {
-                    'System Uptime': {
-                        'value': random.randint(9950, 9999) / 100,  # 99.50% - 99.99%
-                        'unit': '%',
-                        'change': random.randint(-2, 5),
-                        'subdivisions': {sub: random.randint(9900, 9999) / 100 for sub in subdivisions}
-                    },
-                    'Defect Rate': {
-                        'value': random.randint(8, 18) / 10,  # 0.8% - 1.8%
-                        'unit': '%',
-                        'change': random.randint(-30, 10)
-                    },
-                    'Rework Rate': {
-                        'value': random.randint(25, 45) / 10,  # 2.5% - 4.5%
-                        'unit': '%',
-                        'change': random.randint(-20, 15)
-                    },
-                    'Resolution Success': {
-                        'value': random.randint(94, 99),
-                        'unit': '%',
-                        'change': random.randint(-3, 8)
-                    },
-                    'Code Review Coverage': {
-                        'value': random.randint(85, 95),
-                        'unit': '%',
-                        'change': random.randint(-5, 10)
-                    }
-                },
-                'Employee Fulfillment': {
-                    'Engagement Score': {
-                        'value': random.randint(70, 85) / 10,  # 7.0 - 8.5
-                        'unit': '/10',
-                        'change': random.randint(-8, 15),
-                        'subdivisions': {sub: random.randint(65, 90) / 10 for sub in subdivisions}
-                    },
-                    'Attrition Rate': {
-                        'value': random.randint(6, 12),
-                        'unit': '%',
-                        'change': random.randint(-20, 10)
-                    },
-                    'Training Hours': {
-                        'value': random.randint(35, 55),
-                        'unit': 'hrs',
-                        'change': random.randint(-10, 25)
-                    },
-                    'Overtime per FTE': {
-                        'value': random.randint(25, 40) / 10,  # 2.5h - 4.0h
-                        'unit': 'h',
-                        'change': random.randint(-15, 20)
-                    },
-                    'Internal Promotion Rate': {
-                        'value': random.randint(8, 15),
-                        'unit': '%',
-                        'change': random.randint(-5, 20)
-                    }
-                }
-            }
-    return kpi_data
-
-# Generate data
-kpi_data = generate_kpi_data()
+# Opt-in instrumentation: KPI_METRICS=1 records every run, ?debug=1 records this
+# session's runs and shows them in a sidebar panel
+DEBUG_PANEL = st.query_params.get("debug") == "1"
+RECORDING = instrumentation.ENABLED or DEBUG_PANEL
+if RECORDING:
+    instrumentation.start_run()
+
+# Load data (cached per process, see kpi_data.load_kpi_store)
+with timed("data_load"):
+    kpi_store = load_kpi_store()
+    kpi_history = load_kpi_history()
+    kpi_cube = load_kpi_cube()
+    radar_scores = load_radar_scores()
+    # Live points for the streamed KPIs, or None unless KPI_STREAM is set
+    kpi_stream = get_kpi_stream()
+    alert_engine = load_alert_engine()
+
+@st.cache_resource
+def get_figure_cache():
+    """Figure cache shared by every session of this process"""
+    return FigureCache(FIGURE_CACHE_SIZE)
+
+def figure_cache_gauges():
+    return {f"figure_cache_{name}": value for name, value in get_figure_cache().stats().items()}
+
+def memory_gauges():
+    """Bytes held once per process (shared data) versus by this session (its widget state)
+
+    Server memory for N viewers is roughly shared + N x session, plus the figure cache.
+    """
+    shared = {
+        'store': kpi_store.nbytes,
+        'history': kpi_history.nbytes,
+        'cube': kpi_cube.nbytes,
+        'radar_scores': radar_scores.nbytes,
+    }
+    gauges = {f"shared_{name}_bytes": nbytes for name, nbytes in shared.items()}
+    gauges['shared_data_bytes'] = sum(shared.values())
+    gauges['session_state_bytes'] = instrumentation.deep_sizeof(st.session_state.to_dict())
+    return gauges
+
+def run_gauges():
+    return {**figure_cache_gauges(), **memory_gauges()}
+
+def cached_figure(key, build, *args):
+    """Encoded figure for key from the figure cache, timing the build and encoding on a miss
+
+    Each cache entry is encoded once (see figure_json), so reruns that hit the
+    cache send the stored spec without touching Plotly.
+    """
+    def timed_build():
+        increment("figures_built")
+        with timed("figure_build"):
+            return build(*args)
+
+    def timed_encode(figure):
+        with timed("figure_encode"):
+            return encode_figure(figure)
+    return get_figure_cache().get_json(key, timed_build, timed_encode)
+
+def data_view(bu, period):
+    """Store for a single BU/month, the rollup cube for All BUs, quarters and YTD
+
+    Both expose value/change/snapshot/series lookups keyed on (bu, period).
+    """
+    return kpi_store if kpi_cube.is_base(bu, period) else kpi_cube
+
+def render_chart(fig, key=None):
+    """Full-width chart element of an encoded figure, with timing"""
+    increment("figures_serialized")
+    with timed("figure_serialize"):
+        st_plotly(fig, key=key)
 
 def create_kpi_metric(title, value, unit, change, icon="📊"):
     """Create a clean KPI metric display using Streamlit native components"""
-    higher_better = [
-        "Revenue", "Revenue vs Target", "Gross Margin", "CSAT", "NPS", "SLA Achievement",
-        "Retention Rate", "System Uptime", "Resolution Success", "Code Review Coverage",
-        "Engagement Score", "Training Hours/Emp", "Internal Promotion Rate"
-    ]
-    lower_better = [
-        "Cost per Project", "AR Days", "Avg Response Time", "Defect Rate", "Rework Rate",
-        "Attrition Rate", "Overtime per FTE"
-    ]
-
-    # Format the value display
-    if isinstance(value, float):
-        if unit in ['M', 'K']:
-            display_value = f"${value:.1f}{unit}"
-        elif unit == '%':
-            display_value = f"{value:.1f}%"
-        elif unit == '/5':
-            display_value = f"{value:.1f}/5"
-        elif unit == '/10':
-            display_value = f"{value:.1f}/10"
-        elif unit == 'h':
-            display_value = f"{value:.1f}h"
-        else:
-            display_value = f"{value:.1f}{unit}"
+    # Use Streamlit's metric component
+    with timed("metric"):
+        st.metric(**metric_fields(title, value, unit, change, icon))
+
+def create_subdivision_chart(kpi_name, subdivision_data, chart_type="bar", theme="streamlit"):
+    """Create charts for subdivision data (served from the figure cache, filled from a template)"""
+    key = ('subdivision', kpi_name, tuple(subdivision_data.items()), chart_type, theme)
+    return cached_figure(key, subdivision_spec, kpi_name, subdivision_data, chart_type)
+
+def create_radar_chart(bu, month, theme="streamlit"):
+    """Create radar chart for performance overview (served from the figure cache)"""
+    # Normalized for every BU x period at load time (see kpi_scores.RadarScores)
+    scores = radar_scores.scores(bu, month)
+    # The scores are part of the key, so refreshed data never hits a stale figure
+    key = ('radar', bu, month, scores, theme)
+    return cached_figure(key, build_radar_chart, bu, radar_scores.labels, list(scores))
+
+def create_radar_comparison(names, cells, theme="streamlit"):
+    """Radar overlaying several BU/period cells, one trace per name (served from the figure cache)"""
+    traces = tuple((name, radar_scores.scores(bu, period)) for name, (bu, period) in zip(names, cells))
+    key = ('radar_comparison', traces, theme)
+    return cached_figure(key, build_radar_comparison, radar_scores.labels, traces)
+
+def lazy_expander(label, key):
+    """Expander whose body only has to run while it is open (lazy drill-down mode)"""
+    if st.session_state.get('lazy_drilldowns', True):
+        return st.expander(label, expanded=False, key=key, on_change="rerun")
+    return st.expander(label, expanded=False)
+
+def lazy_tabs(labels, key):
+    """Tabs whose bodies only have to run while selected (lazy drill-down mode)"""
+    if st.session_state.get('lazy_drilldowns', True):
+        return st.tabs(labels, key=key, on_change="rerun")
+    return st.tabs(labels)
+
+def is_open(container):
+    """Whether a lazy expander/tab is open; always True when lazy mode is off"""
+    # .open is None for containers created without state tracking
+    return container.open is not False
+
+def format_subdivision(kpi, value):
+    """Display string for a subdivision value of a KPI"""
+    pattern = kpi.drilldown.subdivision_format
+    return pattern.format(value) if pattern else kpi.format(value)
+
+def render_subdivision_tab(kpi, tab, bu, month):
+    """Metric tile and trend chart for one subdivision of a drill-down, from the KPI history"""
+    drilldown = kpi.drilldown
+    view = data_view(bu, month)
+    value = view.value(bu, month, kpi.name, tab.subdivision)
+    if value is None:
+        st.caption(f"No {tab.subdivision} data for {month}")
+        return
+    if view is kpi_store:
+        summary = kpi_history.summary(bu, month, kpi.name, tab.subdivision)
     else:
-        display_value = f"{value}{unit}"
-
-    # Determine delta color based on KPI type
-    if title in higher_better:
-        if change > 0:
-            delta_color = "normal"
-        elif change < 0:
-            delta_color = "inverse"
-        else:
-            delta_color = "off"
-    elif title in lower_better:
-        if change > 0:
-            delta_color = "inverse"
-        elif change < 0:
-            delta_color = "normal"
-        else:
-            delta_color = "off"
+        # Aggregated views change against the previous period of the same kind
+        summary = {'mom': view.change(bu, month, kpi.name, tab.subdivision), 'rolling': None, 'ytd': None,
+                   'trend': None}
+    mom = summary['mom']
+    with timed("metric"):
+        st.metric(f"{tab.subdivision} {drilldown.metric_label}", format_subdivision(kpi, value),
+                  None if mom is None else f"{mom:+.1f}%",
+                  delta_color=delta_color(kpi.direction, mom or 0))
+    averages = [f"{label} avg {format_subdivision(kpi, round(summary[name], 1))}"
+                for name, label in (('rolling', f"{kpi_history.window}-month"), ('ytd', "YTD"))
+                if summary[name] is not None]
+    # Trend: how far the rolling average moved since last month
+    step = round(summary['trend'] or 0, 1)
+    if averages and summary['rolling'] is not None and step:
+        averages[0] += f" {'↑' if step > 0 else '↓'} {format_subdivision(kpi, abs(step))}"
+    if averages:
+        st.caption(" · ".join(averages))
+    last_month = kpi_cube.period_months[month][-1]
+    trend = view.series(bu, kpi.name, tab.subdivision).loc[:last_month].dropna()
+    if len(trend) > 1:
+        fig = create_subdivision_chart(f"{tab.subdivision} {drilldown.chart_title}",
+                                       trend.round(2).to_dict(), tab.chart_type)
+        render_chart(fig, key=f"chart_{drilldown.chart_key}_{tab.subdivision.lower()}")
+
+def render_small_multiples(kpi, bu, month):
+    """Every subdivision tab of a drill-down as one faceted figure with shared axes"""
+    drilldown = kpi.drilldown
+    view = data_view(bu, month)
+    last_month = kpi_cube.period_months[month][-1]
+    subdivisions = [tab.subdivision for tab in drilldown.tabs]
+    frame = view.subdivision_series(bu, kpi.name, subdivisions).loc[:last_month].dropna(how='all').round(2)
+    if len(frame) < 2:
+        st.caption(f"No {kpi.name} history up to {month}")
+        return
+    # One figure for all subdivisions, cached on its data like the per-tab charts
+    key = ('small_multiples', kpi.name, frame.to_json(), 'streamlit')
+    fig = cached_figure(key, build_small_multiples, f"{drilldown.chart_title or kpi.name} by Subdivision", frame)
+    render_chart(fig, key=f"chart_{drilldown.chart_key or kpi.slug}_facets")
+
+def render_drilldown(kpi, record, bu, month):
+    """Details expander for a KPI, driven by its DrillDown spec"""
+    drilldown = kpi.drilldown
+    with lazy_expander(f"{drilldown.icon or kpi.icon} {kpi.name} Details", key=f"exp_{kpi.slug}") as expander:
+        if not is_open(expander):
+            return
+        st.markdown(f"**{drilldown.heading}**")
+        if drilldown.chart_selector:
+            chart_type = st.selectbox("Chart Type", ["bar", "pie", "line"], key=drilldown.chart_selector)
+            fig = create_subdivision_chart(kpi.name, record.subdivisions, chart_type)
+            render_chart(fig)
+            return
+        view = st.segmented_control("View", ["Tabs", "Small multiples"], default="Tabs", key=f"view_{kpi.slug}",
+                                    help="Small multiples: every subdivision's trend in one chart")
+        if view == "Small multiples":
+            render_small_multiples(kpi, bu, month)
+            return
+        tabs = lazy_tabs([tab.subdivision for tab in drilldown.tabs], key=f"tabs_{kpi.slug}")
+        for container, tab in zip(tabs, drilldown.tabs):
+            with container:
+                if is_open(container):
+                    render_subdivision_tab(kpi, tab, bu, month)
+
+def is_live(kpi, bu, month):
+    """Whether the tile of kpi follows the stream: a streamed KPI of a single BU in the latest month"""
+    return (kpi_stream is not None and kpi.name in kpi_stream.kpis
+            and bu in kpi_store.bus and month == kpi_store.months[-1])
+
+@st.fragment(run_every=STREAM_REFRESH)
+def render_live_kpi(kpi, record, bu):
+    """Metric tile and chart of a streamed KPI; reruns on its own every STREAM_REFRESH"""
+    with instrumentation.record_run(RECORDING, run_gauges), timed(f"live:{kpi.name}"):
+        window = kpi_stream.window(bu, kpi.name)
+        if window is None:
+            # Nothing streamed yet: the stored value until the first point arrives
+            create_kpi_metric(kpi.label, record.value, kpi.unit, record.change, kpi.icon)
+            return
+        version, times, values = window
+        first, latest = values[0], values[-1]
+        # "or 0.0" turns a rounded -0.0 into a flat change
+        change = (round((latest - first) / abs(first) * 100, 1) or 0.0) if len(values) > 1 and first else None
+        create_kpi_metric(kpi.label, round(float(latest), 2), kpi.unit, change, kpi.icon)
+        st.caption(f"🔴 Live · {len(values)} points, change over the window")
+        # The buffer version is part of the key, so sessions share each tick's figure
+        fig = cached_figure(('live', kpi.name, bu, version), build_live_chart, kpi.name, times, values)
+        render_chart(fig, key=f"live_{kpi.slug}")
+
+def render_kpi(kpi, current_data, bu, month):
+    """Metric tile plus drill-down for one registered KPI"""
+    record = current_data[kpi.category][kpi.name]
+    if is_live(kpi, bu, month):
+        render_live_kpi(kpi, record, bu)
     else:
-        delta_color = "off"
-
-    change_str = f"{change:+}%"
-
-    # Use Streamlit's metric component
-    st.metric(
-        label=f"{icon} {title}",
-        value=display_value,
-        delta=change_str,
-        delta_color=delta_color
-    )
-
-def create_subdivision_chart(kpi_name, subdivision_data, chart_type="bar"):
-    """Create charts for subdivision data"""
-    subdivisions = list(subdivision_data.keys())
-    values = list(subdivision_data.values())
-    if chart_type == "bar":
-        fig = px.bar(
-            x=subdivisions,
-            y=values,
-            title=f"{kpi_name} by Subdivision",
-            color=values,
-            color_continuous_scale="Blues"
-        )
-    elif chart_type == "pie":
-        fig = px.pie(
-            values=values,
-            names=subdivisions,
-            title=f"{kpi_name} Distribution by Subdivision"
-        )
-    else:  # line chart
-        fig = px.line(
-            x=subdivisions,
-            y=values,
-            title=f"{kpi_name} Trend by Subdivision",
-            markers=True
+        create_kpi_metric(kpi.label, record.value, kpi.unit, record.change, kpi.icon)
+    if kpi.drilldown is not None:
+        render_drilldown(kpi, record, bu, month)
+
+@st.fragment
+def render_section(section, current_data, bu, month):
+    """One KPI section; as a fragment, widgets inside it only rerun this section"""
+    with instrumentation.record_run(RECORDING, run_gauges), timed(f"section:{section.title}"):
+        st.markdown(f"### {section.icon} {section.title}")
+        for column, kpi_names in zip(st.columns(list(section.widths)), section.columns):
+            with column:
+                for name in kpi_names:
+                    render_kpi(KPIS[name], current_data, bu, month)
+
+def radar_peers(bu, count=RADAR_COMPARE_DEFAULT):
+    """The selected BU and the BUs after it in store order, count in all"""
+    bus = list(kpi_store.bus)
+    start = bus.index(bu) if bu in bus else 0
+    return (bus[start:] + bus[:start])[:count]
+
+def radar_months(period, count=RADAR_COMPARE_DEFAULT):
+    """The last count months up to the selected period's last month"""
+    months = list(kpi_store.months)
+    end = months.index(kpi_cube.period_months[period][-1]) + 1
+    return months[max(0, end - count):end]
+
+@st.fragment
+def render_performance_overview(bu, month):
+    """Performance overview radar for the selected BU/month, or several BUs or periods overlaid"""
+    with instrumentation.record_run(RECORDING, run_gauges), timed("section:Performance Overview"):
+        st.markdown("### 📈 Performance Overview")
+        compare = st.segmented_control("Compare", ["Selected", "BUs", "Periods"], default="Selected",
+                                       key="radar_compare")
+        if compare == "BUs":
+            names = st.multiselect("Business units", kpi_cube.bus, default=radar_peers(bu), key="radar_bus")
+            cells = [(name, month) for name in names]
+        elif compare == "Periods":
+            names = st.multiselect("Periods", kpi_cube.periods, default=radar_months(month), key="radar_periods")
+            cells = [(bu, name) for name in names]
+        else:
+            render_chart(create_radar_chart(bu, month))
+            return
+        if not names:
+            st.caption("Pick at least one to compare")
+            return
+        render_chart(create_radar_comparison(names, cells))
+
+@st.fragment
+def render_matrix(bu, month):
+    """Every KPI across BUs or months as one styled grid (matrix layout)"""
+    with instrumentation.record_run(RECORDING, run_gauges), timed("section:Matrix"):
+        controls = st.columns(2)
+        with controls[0]:
+            across = st.segmented_control("Across", [ACROSS_BUS, ACROSS_MONTHS], default=ACROSS_BUS,
+                                          key="matrix_across")
+        with controls[1]:
+            show = st.segmented_control("Show", [SHOW_VALUES, SHOW_CHANGES], default=SHOW_VALUES,
+                                        key="matrix_show")
+        across, show = across or ACROSS_BUS, show or SHOW_VALUES
+        kpis, values, changes = matrix_data(kpi_store, kpi_cube, bu, month, across)
+        with timed("matrix_style"):
+            styler = style_matrix(kpi_store, kpis, values, changes, show)
+        scope = f"{month} · every BU" if across == ACROSS_BUS else f"{bu} · every month"
+        st.markdown(f"### 🧮 KPI Matrix · {scope}")
+        # Tall enough for the sample's BUs and months; larger datasets scroll
+        st.dataframe(styler, width="stretch", height=min(len(values) + 1, 16) * 35 + 3)
+        st.caption("Green and red follow each KPI's direction, as on the metric tiles; "
+                   "changes are against the previous period")
+
+def alert_scope(bu):
+    """BU whose alerts are shown: the selected one, or None (every BU) for All BUs"""
+    return bu if bu in kpi_store.bus else None
+
+# Both alert surfaces rerun with the stream, so live breaches show up without a page rerun
+# and the badges always list the same active set as the panel
+@st.fragment(run_every=STREAM_REFRESH if kpi_stream is not None else None)
+def render_alert_badges(bu):
+    """Sidebar badge list of the active alerts"""
+    with instrumentation.record_run(RECORDING, run_gauges), timed("sidebar:Alerts"):
+        alerts = alert_engine.alerts(alert_scope(bu))
+        st.markdown(f"### 🚨 Alerts ({len(alerts)})")
+        if not alerts:
+            st.badge("No active alerts", icon="✅", color="green")
+        for alert in alerts[:SIDEBAR_ALERTS]:
+            label = alert.kpi if alert.subdivision == TOTAL else f"{alert.kpi} · {alert.subdivision}"
+            if alert.kind == BREACH:
+                st.badge(label, icon="🔴", color="red")
+            else:
+                st.badge(label, icon="🟠", color="orange")
+        if len(alerts) > SIDEBAR_ALERTS:
+            st.caption(f"+{len(alerts) - SIDEBAR_ALERTS} more in the alerts panel")
+
+@st.fragment(run_every=STREAM_REFRESH if kpi_stream is not None else None)
+def render_alerts_panel(bu):
+    """Table of every active alert: threshold breaches and anomalous moves (see kpi_alerts)"""
+    with instrumentation.record_run(RECORDING, run_gauges), timed("section:Alerts"):
+        alerts = alert_engine.alerts(alert_scope(bu))
+        with lazy_expander(f"🚨 Alerts ({len(alerts)})", key="alerts_panel") as expander:
+            if not is_open(expander):
+                return
+            if not alerts:
+                st.caption("No active alerts")
+                return
+            rows = [
+                {'': '🔴' if alert.kind == BREACH else '🟠', 'BU': alert.bu, 'KPI': alert.kpi,
+                 'Subdivision': alert.subdivision, 'Value': alert.value, 'Expected': alert.expected,
+                 'At': alert.at, 'Alert': alert.message}
+                for alert in alerts
+            ]
+            st.dataframe(pd.DataFrame(rows), hide_index=True, width="stretch")
+
+def render_debug_panel(run):
+    """Sidebar panel (?debug=1) with the timings of this run and process-wide totals"""
+    with st.sidebar.expander("🛠️ Debug: render timings", expanded=True):
+        rows = [
+            {'block': name, 'ms': round(total * 1000, 2), 'count': count, 'max ms': round(longest * 1000, 2)}
+            for name, (count, total, longest) in sorted(run.timers.items(), key=lambda item: -item[1][1])
+        ]
+        st.dataframe(pd.DataFrame(rows), hide_index=True, width="stretch")
+        cache = get_figure_cache().stats()
+        st.caption(
+            f"Figures built: {run.counters.get('figures_built', 0)} · "
+            f"serialized: {run.counters.get('figures_serialized', 0)} · "
+            f"figure cache: {cache['size']}/{cache['maxsize']}, hit rate {cache['hit_rate']:.0%}"
         )
-    fig.update_layout(
-        height=400,
-        showlegend=True if chart_type == "pie" else False
-    )
-    return fig
-
-def create_radar_chart(bu, month):
-    """Create radar chart for performance overview"""
-    data = kpi_data[bu][month]
-    # Extract key metrics for radar chart
-    metrics = [
-        'Revenue Performance',
-        'Customer Satisfaction',
-        'Quality Score',
-        'Employee Engagement',
-        'Operational Efficiency',
-        'Cost Management'
-    ]
-    # Calculate normalized scores (0-100)
-    scores = [
-        min(100, data['Financial']['Revenue vs Target']['value']),
-        data['Customer & Service']['CSAT']['value'] * 20,  # Convert 4.5/5 to 90/100
-        data['Quality Metrics']['System Uptime']['value'],
-        data['Employee Fulfillment']['Engagement Score']['value'] * 10,  # Convert 8.5/10 to 85/100
-        100 - data['Quality Metrics']['Defect Rate']['value'] * 10,  # Invert defect rate
-        100 - abs(data['Financial']['Cost per Project']['change'])  # Invert cost increase
-    ]
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(
-        r=scores,
-        theta=metrics,
-        fill='toself',
-        name=f'{bu} Performance',
-        line_color='#4472C4',
-        fillcolor='rgba(68, 114, 196, 0.3)'
-    ))
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 100]
-            )),
-        showlegend=True,
-        title="Performance Overview",
-        height=350
-    )
-    return fig
+        st.caption(f"Memory: {run.gauges['shared_data_bytes'] / 1e6:.1f} MB shared data per process, "
+                   f"{run.gauges['session_state_bytes'] / 1e3:.1f} KB session state for this viewer")
+        totals = instrumentation.metrics.snapshot()
+        st.caption(f"Process totals: {totals['runs']} runs recorded, "
+                   f"{totals['counters'].get('figures_built', 0)} figures built")
 
 # Main app layout
 def main():
+    # Sidebar navigation. The widgets are keyed, so their session state is the selection
+    # itself (one script run per change), and bound to ?month=...&bu=... for deep links.
+    with st.sidebar:
+        st.markdown("### Select Period")
+        # Months, then quarters and YTD served from the rollup cube; opens on the latest month,
+        # which has the full history for trend charts and is the one live tiles follow
+        selected_month = st.selectbox("Period", kpi_cube.periods, index=kpi_cube.periods.index(kpi_store.months[-1]),
+                                      key="month", bind="query-params")
+        st.markdown("### Select Business Unit")
+        selected_bu = st.radio("Business Unit", kpi_cube.bus, key="bu", bind="query-params")
+        st.markdown("---")
+        layout = st.segmented_control("Layout", ["Tiles", "Matrix"], default="Tiles", key="layout",
+                                      bind="query-params",
+                                      help="Matrix shows every KPI across BUs or months in one grid")
+        st.toggle("Lazy drill-downs", value=True, key="lazy_drilldowns",
+                  help="Only build detail charts once their section or tab is opened")
+        st.button("🔄 Refresh data", on_click=refresh_kpi_data, help="Reload the KPI dataset for every session")
+        st.markdown("---")
+        render_alert_badges(selected_bu)
+
     # Header with animated gradient
     st.markdown(f"""
     <div style="
@@ -304,417 +430,43 @@ def main():
         </style>
         <h1 style="margin: 0; font-size: 32px; font-weight: 700; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">IT Company Dashboard</h1>
         <h2 style="margin: 10px 0 0 0; font-size: 24px; opacity: 0.95; font-weight: 500;">
-            {st.session_state.selected_bu} Performance
+            {selected_bu} Performance
         </h2>
     </div>
     """, unsafe_allow_html=True)
 
-    # Create layout with sidebar and main content
-    with st.sidebar:
-        st.markdown("### Select Month")
-        selected_month = st.selectbox(
-            "Month",
-            ['January', 'February', 'March', 'April', 'May', 'June'],
-            index=['January', 'February', 'March', 'April', 'May', 'June'].index(st.session_state.selected_month)
-        )
-        st.markdown("### Select Business Unit")
-        selected_bu = st.radio(
-            "Business Unit",
-            ['BU1', 'BU2', 'BU3'],
-            index=['BU1', 'BU2', 'BU3'].index(st.session_state.selected_bu)
-        )
-        # Update session state
-        if selected_month != st.session_state.selected_month or selected_bu != st.session_state.selected_bu:
-            st.session_state.selected_month = selected_month
-            st.session_state.selected_bu = selected_bu
-            st.rerun()
-
-    # Get current data
-    current_data = kpi_data[st.session_state.selected_bu][st.session_state.selected_month]
-
     # Main layout
     col_left, col_right = st.columns([2, 1])
     with col_left:
-        # Financial Section
-        st.markdown("### 📊 Financial")
-        fin_col1, fin_col2, fin_col3 = st.columns([1, 1, 1])
-        with fin_col1:
-            # Revenue vs Target
-            target_data = current_data['Financial']['Revenue vs Target']
-            create_kpi_metric("Revenue vs Target", target_data['value'], "%", target_data['change'], "🎯")
-            with st.expander("💰 Revenue vs Target Details", expanded=False):
-                st.markdown("**Subdivision Breakdown**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Target Achievement", "98%", "3%")
-                    fig = create_subdivision_chart("PRODEV Revenue vs Target", {"Jan": 95, "Feb": 97, "Mar": 96, "Apr": 98, "May": 99}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_target_prodev")
-                with tab2:
-                    st.metric("PD1 Target Achievement", "89%", "2%")
-                    fig = create_subdivision_chart("PD1 Revenue vs Target", {"Jan": 87, "Feb": 88, "Mar": 89, "Apr": 90, "May": 91}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_target_pd1")
-                with tab3:
-                    st.metric("PD2 Target Achievement", "92%", "1%")
-                with tab4:
-                    st.metric("DOCS Target Achievement", "95%", "4%")
-            # Cost per Project
-            cost_data = current_data['Financial']['Cost per Project']
-            create_kpi_metric("Cost per Project", cost_data['value'], "K", cost_data['change'], "💸")
-            with st.expander("💸 Cost per Project Details", expanded=False):
-                st.markdown("**Cost Breakdown by Subdivision**")
-                tab1, tab2 = st.tabs(["PRODEV", "PD1"])
-                with tab1:
-                    st.metric("PRODEV Cost", "$45K", "-5%")
-                    fig = create_subdivision_chart("PRODEV Cost Trend", {"Jan": 48, "Feb": 47, "Mar": 45, "Apr": 44, "May": 42}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_cost_prodev")
-                with tab2:
-                    st.metric("PD1 Cost", "$38K", "-2%")
-                    fig = create_subdivision_chart("PD1 Cost Trend", {"Jan": 40, "Feb": 39, "Mar": 38, "Apr": 37, "May": 36}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_cost_pd1")
-        with fin_col2:
-            # Gross Margin
-            margin_data = current_data['Financial']['Gross Margin']
-            create_kpi_metric("Gross Margin", margin_data['value'], "%", margin_data['change'], "📊")
-            with st.expander("📊 Gross Margin Details", expanded=False):
-                st.markdown("**Margin Analysis by Subdivision**")
-                tab1, tab2 = st.tabs(["PRODEV", "PD1"])
-                with tab1:
-                    st.metric("PRODEV Margin", "42%", "2%")
-                    fig = create_subdivision_chart("PRODEV Margin Trend", {"Jan": 40, "Feb": 41, "Mar": 42, "Apr": 43, "May": 44}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_margin_prodev")
-                with tab2:
-                    st.metric("PD1 Margin", "38%", "1%")
-                    fig = create_subdivision_chart("PD1 Margin Trend", {"Jan": 37, "Feb": 37, "Mar": 38, "Apr": 38, "May": 39}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_margin_pd1")
-            # AR Days
-            ar_data = current_data['Financial']['AR Days']
-            create_kpi_metric("AR Days", ar_data['value'], "days", ar_data['change'], "📅")
-            with st.expander("📅 AR Days Details", expanded=False):
-                st.markdown("**AR Days by Subdivision**")
-                tab1, tab2 = st.tabs(["PRODEV", "PD1"])
-                with tab1:
-                    st.metric("PRODEV AR Days", "28", "-3")
-                    fig = create_subdivision_chart("PRODEV AR Days", {"Jan": 31, "Feb": 30, "Mar": 29, "Apr": 28, "May": 27}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_ar_prodev")
-                with tab2:
-                    st.metric("PD1 AR Days", "35", "-1")
-                    fig = create_subdivision_chart("PD1 AR Days", {"Jan": 36, "Feb": 36, "Mar": 35, "Apr": 35, "May": 34}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_ar_pd1")
-        with fin_col3:
-            # Revenue
-            revenue_data = current_data['Financial']['Revenue']
-            create_kpi_metric("Revenue", revenue_data['value'], "M", revenue_data['change'], "💰")
-            with st.expander("💰 Revenue Details", expanded=False):
-                st.markdown("**Revenue Breakdown by Subdivision**")
-                tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS", "ITS", "CHAPTER"])
-                with tab1:
-                    st.metric("PRODEV Revenue", f"${revenue_data['subdivisions']['PRODEV']}K", "5.2%")
-                    fig = create_subdivision_chart("PRODEV Revenue", {"Jan": 45, "Feb": 52, "Mar": 48, "Apr": 55, "May": 60}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_revenue_prodev")
-                with tab2:
-                    st.metric("PD1 Revenue", f"${revenue_data['subdivisions']['PD1']}K", "3.1%")
-                    fig = create_subdivision_chart("PD1 Revenue", {"Jan": 35, "Feb": 42, "Mar": 38, "Apr": 45, "May": 50}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_revenue_pd1")
-                with tab3:
-                    st.metric("PD2 Revenue", f"${revenue_data['subdivisions']['PD2']}K", "2.8%")
-                with tab4:
-                    st.metric("DOCS Revenue", f"${revenue_data['subdivisions']['DOCS']}K", "1.5%")
-                with tab5:
-                    st.metric("ITS Revenue", f"${revenue_data['subdivisions']['ITS']}K", "6.2%")
-                with tab6:
-                    st.metric("CHAPTER Revenue", f"${revenue_data['subdivisions']['CHAPTER']}K", "4.1%")
-
-        # Customer & Service Section
-        st.markdown("### 👥 Customer & Service")
-        cs_col1, cs_col2, cs_col3 = st.columns([1, 1, 1])
-
-        with cs_col1:
-            # NPS
-            nps_data = current_data['Customer & Service']['NPS']
-            create_kpi_metric("NPS", nps_data['value'], "", nps_data['change'], "📈")
-            with st.expander("📈 NPS Details", expanded=False):
-                st.markdown("**Net Promoter Score by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV NPS", "50", "+5")
-                    fig = create_subdivision_chart("PRODEV NPS", {"Jan": 45, "Feb": 47, "Mar": 48, "Apr": 49, "May": 50}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_nps_prodev")
-                with tab2:
-                    st.metric("PD1 NPS", "40", "+3")
-                    fig = create_subdivision_chart("PD1 NPS", {"Jan": 38, "Feb": 39, "Mar": 40, "Apr": 41, "May": 42}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_nps_pd1")
-                with tab3:
-                    st.metric("PD2 NPS", "45", "+2")
-                with tab4:
-                    st.metric("DOCS NPS", "38", "+4")
-
-            # Avg Response Time
-            response_data = current_data['Customer & Service']['Avg Response Time']
-            create_kpi_metric("Avg Response Time", response_data['value'], "h", response_data['change'], "⏱️")
-            with st.expander("⏱️ Avg Response Time Details", expanded=False):
-                st.markdown("**Average Response Time by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Avg Response", "2.5h", "-0.3h")
-                    fig = create_subdivision_chart("PRODEV Response Time", {"Jan": 3.0, "Feb": 2.8, "Mar": 2.7, "Apr": 2.6, "May": 2.5}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_response_prodev")
-                with tab2:
-                    st.metric("PD1 Avg Response", "2.8h", "-0.2h")
-                    fig = create_subdivision_chart("PD1 Response Time", {"Jan": 3.2, "Feb": 3.0, "Mar": 2.9, "Apr": 2.8, "May": 2.7}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_response_pd1")
-                with tab3:
-                    st.metric("PD2 Avg Response", "3.0h", "-0.1h")
-                with tab4:
-                    st.metric("DOCS Avg Response", "2.6h", "-0.3h")
-
-        with cs_col2:
-            # SLA Achievement
-            sla_data = current_data['Customer & Service']['SLA Achievement']
-            create_kpi_metric("SLA Achievement", sla_data['value'], "%", sla_data['change'], "🎯")
-            with st.expander("🎯 SLA Achievement Details", expanded=False):
-                st.markdown("**SLA Achievement by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV SLA", "95%", "+2%")
-                    fig = create_subdivision_chart("PRODEV SLA", {"Jan": 90, "Feb": 91, "Mar": 93, "Apr": 94, "May": 95}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_sla_prodev")
-                with tab2:
-                    st.metric("PD1 SLA", "92%", "+1%")
-                    fig = create_subdivision_chart("PD1 SLA", {"Jan": 91, "Feb": 91, "Mar": 92, "Apr": 92, "May": 93}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_sla_pd1")
-                with tab3:
-                    st.metric("PD2 SLA", "90%", "+1%")
-                with tab4:
-                    st.metric("DOCS SLA", "93%", "+2%")
-
-            # Retention Rate
-            retention_data = current_data['Customer & Service']['Retention Rate']
-            create_kpi_metric("Retention Rate", retention_data['value'], "%", retention_data['change'], "🔒")
-            with st.expander("🔒 Retention Rate Details", expanded=False):
-                st.markdown("**Customer Retention by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Retention", "94%", "+1%")
-                    fig = create_subdivision_chart("PRODEV Retention Rate", {"Jan": 92, "Feb": 93, "Mar": 93, "Apr": 94, "May": 95}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_retention_prodev")
-                with tab2:
-                    st.metric("PD1 Retention", "91%", "+1%")
-                    fig = create_subdivision_chart("PD1 Retention Rate", {"Jan": 90, "Feb": 90, "Mar": 91, "Apr": 91, "May": 92}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_retention_pd1")
-                with tab3:
-                    st.metric("PD2 Retention", "90%", "+1%")
-                with tab4:
-                    st.metric("DOCS Retention", "92%", "+2%")
-
-        with cs_col3:
-            # CSAT
-            csat_data = current_data['Customer & Service']['CSAT']
-            create_kpi_metric("CSAT", csat_data['value'], "/5", csat_data['change'], "⭐")
-            with st.expander("⭐ CSAT Details", expanded=False):
-                st.markdown("**Customer Satisfaction by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV CSAT", f"{csat_data['subdivisions']['PRODEV']:.1f}/5", "0.2")
-                    fig = create_subdivision_chart("PRODEV CSAT", {"Jan": 4.1, "Feb": 4.3, "Mar": 4.2, "Apr": 4.4, "May": 4.5}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_csat_prodev")
-                with tab2:
-                    st.metric("PD1 CSAT", f"{csat_data['subdivisions']['PD1']:.1f}/5", "0.1")
-                    fig = create_subdivision_chart("PD1 CSAT", {"Jan": 3.9, "Feb": 4.0, "Mar": 4.1, "Apr": 4.2, "May": 4.3}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_csat_pd1")
-                with tab3:
-                    st.metric("PD2 CSAT", f"{csat_data['subdivisions']['PD2']:.1f}/5", "0.3")
-                with tab4:
-                    st.metric("DOCS CSAT", f"{csat_data['subdivisions']['DOCS']:.1f}/5", "0.1")
-
-        # Quality Metrics Section
-        st.markdown("### 🎯 Quality Metrics")
-        qm_col1, qm_col2, qm_col3 = st.columns([2, 1, 1])
-
-        with qm_col1:
-            # System Uptime
-            uptime_data = current_data['Quality Metrics']['System Uptime']
-            create_kpi_metric("System Uptime", uptime_data['value'], "%", uptime_data['change'], "⚡")
-            with st.expander("⚡ System Uptime Details", expanded=False):
-                st.markdown("**System Uptime by Subdivision**")
-                chart_type = st.selectbox("Chart Type", ["bar", "pie", "line"], key="uptime_chart")
-                fig = create_subdivision_chart("System Uptime", uptime_data['subdivisions'], chart_type)
-                st.plotly_chart(fig, use_container_width=True)
-
-        with qm_col2:
-            # Defect Rate
-            defect_data = current_data['Quality Metrics']['Defect Rate']
-            create_kpi_metric("Defect Rate", defect_data['value'], "%", defect_data['change'], "🔍")
-            with st.expander("🔍 Defect Rate Details", expanded=False):
-                st.markdown("**Defect Rate by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Defect Rate", "1.2%", "-0.2%")
-                    fig = create_subdivision_chart("PRODEV Defect Rate", {"Jan": 1.5, "Feb": 1.4, "Mar": 1.3, "Apr": 1.2, "May": 1.1}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_defect_prodev")
-                with tab2:
-                    st.metric("PD1 Defect Rate", "1.4%", "-0.1%")
-                    fig = create_subdivision_chart("PD1 Defect Rate", {"Jan": 1.6, "Feb": 1.5, "Mar": 1.4, "Apr": 1.4, "May": 1.3}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_defect_pd1")
-                with tab3:
-                    st.metric("PD2 Defect Rate", "1.5%", "0%")
-                with tab4:
-                    st.metric("DOCS Defect Rate", "1.3%", "-0.2%")
-
-            # Rework Rate
-            rework_data = current_data['Quality Metrics']['Rework Rate']
-            create_kpi_metric("Rework Rate", rework_data['value'], "%", rework_data['change'], "🔄")
-            with st.expander("🔄 Rework Rate Details", expanded=False):
-                st.markdown("**Rework Rate by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Rework Rate", "3.2%", "-0.3%")
-                    fig = create_subdivision_chart("PRODEV Rework Rate", {"Jan": 3.8, "Feb": 3.6, "Mar": 3.4, "Apr": 3.3, "May": 3.2}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_rework_prodev")
-                with tab2:
-                    st.metric("PD1 Rework Rate", "3.5%", "-0.2%")
-                    fig = create_subdivision_chart("PD1 Rework Rate", {"Jan": 3.9, "Feb": 3.8, "Mar": 3.6, "Apr": 3.5, "May": 3.4}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_rework_pd1")
-                with tab3:
-                    st.metric("PD2 Rework Rate", "3.8%", "-0.1%")
-                with tab4:
-                    st.metric("DOCS Rework Rate", "3.4%", "-0.2%")
-
-        with qm_col3:
-            # Resolution Success
-            resolution_data = current_data['Quality Metrics']['Resolution Success']
-            create_kpi_metric("Resolution Success", resolution_data['value'], "%", resolution_data['change'], "✅")
-            with st.expander("✅ Resolution Success Details", expanded=False):
-                st.markdown("**Resolution Success by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Resolution", "97%", "+1%")
-                    fig = create_subdivision_chart("PRODEV Resolution", {"Jan": 95, "Feb": 96, "Mar": 96, "Apr": 97, "May": 98}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_resolution_prodev")
-                with tab2:
-                    st.metric("PD1 Resolution", "95%", "+1%")
-                    fig = create_subdivision_chart("PD1 Resolution", {"Jan": 94, "Feb": 94, "Mar": 95, "Apr": 95, "May": 96}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_resolution_pd1")
-                with tab3:
-                    st.metric("PD2 Resolution", "94%", "+1%")
-                with tab4:
-                    st.metric("DOCS Resolution", "96%", "+2%")
-
-            # Code Review Coverage
-            review_data = current_data['Quality Metrics']['Code Review Coverage']
-            create_kpi_metric("Code Review Coverage", review_data['value'], "%", review_data['change'], "📝")
-            with st.expander("📝 Code Review Coverage Details", expanded=False):
-                st.markdown("**Code Review Coverage by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Code Review", "92%", "+2%")
-                    fig = create_subdivision_chart("PRODEV Code Review", {"Jan": 88, "Feb": 89, "Mar": 90, "Apr": 91, "May": 92}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_review_prodev")
-                with tab2:
-                    st.metric("PD1 Code Review", "90%", "+1%")
-                    fig = create_subdivision_chart("PD1 Code Review", {"Jan": 87, "Feb": 88, "Mar": 89, "Apr": 89, "May": 90}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_review_pd1")
-                with tab3:
-                    st.metric("PD2 Code Review", "89%", "+1%")
-                with tab4:
-                    st.metric("DOCS Code Review", "91%", "+2%")
-
-        # Employee Fulfillment Section
-        st.markdown("### 👨‍💼 Employee Fulfillment")
-        ef_col1, ef_col2, ef_col3 = st.columns([2, 1, 1])
-
-        with ef_col1:
-            # Engagement Score
-            engagement_data = current_data['Employee Fulfillment']['Engagement Score']
-            create_kpi_metric("Engagement Score", engagement_data['value'], "/10", engagement_data['change'], "👨‍💼")
-            with st.expander("👨‍💼 Engagement Score Details", expanded=False):
-                st.markdown("**Employee Engagement by Subdivision**")
-                chart_type = st.selectbox("Chart Type", ["bar", "pie", "line"], key="engagement_chart")
-                fig = create_subdivision_chart("Engagement Score", engagement_data['subdivisions'], chart_type)
-                st.plotly_chart(fig, use_container_width=True)
-
-        with ef_col2:
-            # Attrition Rate
-            attrition_data = current_data['Employee Fulfillment']['Attrition Rate']
-            create_kpi_metric("Attrition Rate", attrition_data['value'], "%", attrition_data['change'], "📉")
-            with st.expander("📉 Attrition Rate Details", expanded=False):
-                st.markdown("**Attrition Rate by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Attrition", "8%", "-1%")
-                    fig = create_subdivision_chart("PRODEV Attrition", {"Jan": 10, "Feb": 9, "Mar": 9, "Apr": 8, "May": 8}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_attrition_prodev")
-                with tab2:
-                    st.metric("PD1 Attrition", "9%", "-1%")
-                    fig = create_subdivision_chart("PD1 Attrition", {"Jan": 11, "Feb": 10, "Mar": 9, "Apr": 9, "May": 9}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_attrition_pd1")
-                with tab3:
-                    st.metric("PD2 Attrition", "10%", "0%")
-                with tab4:
-                    st.metric("DOCS Attrition", "7%", "-1%")
-
-            # Training Hours
-            training_data = current_data['Employee Fulfillment']['Training Hours']
-            create_kpi_metric("Training Hours/Emp", training_data['value'], "hrs", training_data['change'], "📚")
-            with st.expander("📚 Training Hours Details", expanded=False):
-                st.markdown("**Training Hours per Employee by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Training", "45 hrs", "+3 hrs")
-                    fig = create_subdivision_chart("PRODEV Training", {"Jan": 38, "Feb": 40, "Mar": 42, "Apr": 44, "May": 45}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_training_prodev")
-                with tab2:
-                    st.metric("PD1 Training", "40 hrs", "+2 hrs")
-                    fig = create_subdivision_chart("PD1 Training", {"Jan": 35, "Feb": 36, "Mar": 38, "Apr": 39, "May": 40}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_training_pd1")
-                with tab3:
-                    st.metric("PD2 Training", "38 hrs", "+1 hrs")
-                with tab4:
-                    st.metric("DOCS Training", "42 hrs", "+3 hrs")
-
-        with ef_col3:
-            # Overtime per FTE
-            overtime_data = current_data['Employee Fulfillment']['Overtime per FTE']
-            create_kpi_metric("Overtime per FTE", overtime_data['value'], "h", overtime_data['change'], "⏰")
-            with st.expander("⏰ Overtime per FTE Details", expanded=False):
-                st.markdown("**Overtime per FTE by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Overtime", "3.0h", "-0.2h")
-                    fig = create_subdivision_chart("PRODEV Overtime", {"Jan": 3.5, "Feb": 3.4, "Mar": 3.2, "Apr": 3.1, "May": 3.0}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_overtime_prodev")
-                with tab2:
-                    st.metric("PD1 Overtime", "3.2h", "-0.1h")
-                    fig = create_subdivision_chart("PD1 Overtime", {"Jan": 3.6, "Feb": 3.5, "Mar": 3.4, "Apr": 3.3, "May": 3.2}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_overtime_pd1")
-                with tab3:
-                    st.metric("PD2 Overtime", "3.5h", "0h")
-                with tab4:
-                    st.metric("DOCS Overtime", "3.1h", "-0.2h")
-
-            # Internal Promotion Rate
-            promotion_data = current_data['Employee Fulfillment']['Internal Promotion Rate']
-            create_kpi_metric("Internal Promotion Rate", promotion_data['value'], "%", promotion_data['change'], "🎖️")
-            with st.expander("🎖️ Internal Promotion Rate Details", expanded=False):
-                st.markdown("**Internal Promotion Rate by Subdivision**")
-                tab1, tab2, tab3, tab4 = st.tabs(["PRODEV", "PD1", "PD2", "DOCS"])
-                with tab1:
-                    st.metric("PRODEV Promotion", "12%", "+1%")
-                    fig = create_subdivision_chart("PRODEV Promotion Rate", {"Jan": 10, "Feb": 10, "Mar": 11, "Apr": 11, "May": 12}, "line")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_promotion_prodev")
-                with tab2:
-                    st.metric("PD1 Promotion", "10%", "+1%")
-                    fig = create_subdivision_chart("PD1 Promotion Rate", {"Jan": 9, "Feb": 9, "Mar": 9, "Apr": 10, "May": 10}, "bar")
-                    st.plotly_chart(fig, use_container_width=True, key="chart_promotion_pd1")
-                with tab3:
-                    st.metric("PD2 Promotion", "9%", "+1%")
-                with tab4:
-                    st.metric("DOCS Promotion", "11%", "+2%")
+        if layout == "Matrix":
+            render_matrix(selected_bu, selected_month)
+        else:
+            # Get current data
+            current_data = data_view(selected_bu, selected_month).snapshot(selected_bu, selected_month)
+            for section in SECTIONS:
+                render_section(section, current_data, selected_bu, selected_month)
 
     with col_right:
-        # Performance Overview
-        st.markdown("### 📈 Performance Overview")
-        fig_radar = create_radar_chart(st.session_state.selected_bu, st.session_state.selected_month)
-        st.plotly_chart(fig_radar, use_container_width=True)
+        render_performance_overview(selected_bu, selected_month)
+        render_alerts_panel(selected_bu)
+
+    run = instrumentation.finish_run(run_gauges)
+    if DEBUG_PANEL and run is not None:
+        render_debug_panel(run)
 
 if __name__ == "__main__":
-    main()
+    # Opt-in call profile of this run: ?profile=1 (cProfile) or ?profile=pyinstrument, or KPI_PROFILE
+    profile_param = st.query_params.get("profile")
+    profile_mode = profiling.requested_mode(profile_param)
+    if profile_mode is None:
+        main()
+    else:
+        label = f"{st.session_state.get('bu', '')}-{st.session_state.get('month', '')}"
+        profile = profiling.profile_call(main, profile_mode, label)
+        if profile_param is not None:
+            # One profiled run per request; add the parameter again for another
+            del st.query_params["profile"]
+            if profile is None:
+                st.sidebar.caption("🔬 Profiling skipped: another run was profiled recently")
+            else:
+                st.sidebar.caption(f"🔬 Profile written to `{profile}`")
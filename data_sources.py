@@ -0,0 +1,163 @@
+import glob
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import pandas as pd
+
+from kpi_cube import KPICube
+from kpi_store import KPIStore
+
+# Long-format schema every source must produce (target is optional)
+SOURCE_COLUMNS = ['bu', 'month', 'category', 'kpi', 'subdivision', 'value', 'change', 'unit']
+
+class KPISource:
+    """Base class for file-backed KPI sources that reload incrementally
+
+    Subclasses implement changed_frames(), yielding long-format frames for only
+    the partitions or rows that changed since the previous call. refresh() folds
+    them into a KPIStore that lives as long as the source does, and keeps a KPICube
+    of its rollups current by rebuilding only the BUs that received rows.
+    """
+
+    def __init__(self):
+        self.store = None
+        self.cube = None
+        self._lock = threading.Lock()
+
+    def changed_frames(self):
+        raise NotImplementedError
+
+    def refresh(self):
+        """Ingest what changed since the last refresh and return the current store"""
+        with self._lock:
+            frames = [frame for frame in self.changed_frames() if len(frame)]
+            if frames:
+                frame = pd.concat(frames, ignore_index=True)
+                missing = [col for col in SOURCE_COLUMNS if col not in frame]
+                if missing:
+                    raise ValueError(f"KPI source {self!r} is missing columns: {', '.join(missing)}")
+                if self.store is None:
+                    self.store = KPIStore.from_frame(frame)
+                    self.cube = KPICube(self.store)
+                else:
+                    self.store = self.store.merge_frame(frame)
+                    self.cube = self.cube.update(self.store, frame['bu'].unique())
+            if self.store is None:
+                raise ValueError(f"KPI source {self!r} produced no rows")
+            return self.store
+
+class FilePartitionSource(KPISource):
+    """Directory or glob of extract files, one partition per file
+
+    A partition is re-read only when its mtime or size changes. Rows for cells
+    that already exist overwrite them; deleted files are not retracted.
+    """
+
+    extension = None
+
+    def __init__(self, path):
+        super().__init__()
+        if os.path.isdir(path):
+            path = os.path.join(path, f"*{self.extension}")
+        self.pattern = path
+        self._seen = {}  # path -> (mtime_ns, size)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.pattern!r})"
+
+    def read(self, path):
+        raise NotImplementedError
+
+    def changed_frames(self):
+        for path in sorted(glob.glob(self.pattern)):
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._seen.get(path) != signature:
+                frame = self.read(path)
+                self._seen[path] = signature
+                yield frame
+
+class CSVSource(FilePartitionSource):
+    extension = '.csv'
+
+    def read(self, path):
+        return pd.read_csv(path, keep_default_na=False, na_values=[''],
+                           dtype={'bu': str, 'month': str, 'kpi': str, 'subdivision': str, 'unit': str})
+
+class ParquetSource(FilePartitionSource):
+    extension = '.parquet'
+
+    def __init__(self, path):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as exc:
+            raise ImportError("ParquetSource requires pyarrow (pip install pyarrow)") from exc
+        super().__init__(path)
+
+    def read(self, path):
+        return pd.read_parquet(path)
+
+class SQLiteSource(KPISource):
+    """SQLite table with an update timestamp column used as the reload watermark
+
+    The watermark is the newest timestamp plus the number of rows carrying it, so
+    rows added later with that same timestamp (common with second resolution)
+    are still picked up. Index the timestamp column so the probe and the range
+    scan stay cheap.
+    """
+
+    def __init__(self, path, table='kpi_facts', timestamp_column='updated_at'):
+        super().__init__()
+        for name in (table, timestamp_column):
+            if not name.isidentifier():
+                raise ValueError(f"Invalid SQLite identifier: {name!r}")
+        self.path = path
+        self.table = table
+        self.timestamp_column = timestamp_column
+        self._watermark = None
+
+    def __repr__(self):
+        return f"SQLiteSource({self.path!r}, table={self.table!r})"
+
+    def changed_frames(self):
+        column = self.timestamp_column
+        with closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)) as conn:
+            # Cheap probe first: the newest timestamp and how many rows carry it. Nothing to
+            # ingest unless it moved past the watermark or rows were added at that timestamp.
+            latest, count = conn.execute(
+                f"SELECT {column}, COUNT(*) FROM {self.table}"
+                f" WHERE {column} = (SELECT MAX({column}) FROM {self.table})").fetchone()
+            if latest is None or (self._watermark is not None and (latest, count) == self._watermark):
+                return
+            query = f"SELECT * FROM {self.table}"
+            params = ()
+            if self._watermark is not None:
+                # >= so rows that share the watermark's timestamp but arrived later are read too;
+                # the ones already ingested are re-read and overwrite themselves
+                query += f" WHERE {column} >= ?"
+                params = (self._watermark[0],)
+            frame = pd.read_sql_query(f"{query} ORDER BY {column}", conn, params=params)
+        # Rows committed after the probe change the count (or the timestamp) and are read next time
+        self._watermark = (latest, count)
+        yield frame.drop(columns=[column])
+
+SOURCE_TYPES = {
+    'csv': CSVSource,
+    'parquet': ParquetSource,
+    'sqlite': SQLiteSource,
+}
+
+def open_source(spec):
+    """Create a source from a "<kind>:<path>" spec, e.g. "csv:/data/kpi" or "sqlite:/data/kpi.db"
+
+    SQLite specs may name the table after a '#', e.g. "sqlite:/data/kpi.db#kpi_facts".
+    """
+    kind, sep, path = spec.partition(':')
+    if not sep or kind not in SOURCE_TYPES:
+        raise ValueError(f"Unknown KPI source {spec!r}; expected one of: {', '.join(SOURCE_TYPES)}")
+    if kind == 'sqlite':
+        path, _, table = path.partition('#')
+        return SQLiteSource(path, table or 'kpi_facts')
+    return SOURCE_TYPES[kind](path)
@@ -0,0 +1,50 @@
+"""Shape-preserving downsampling of long series for charting
+
+Both methods pick a subset of the original points and return their indices in
+order, so labels and hover values stay exact.
+"""
+import numpy as np
+
+def lttb(y, n_out, x=None):
+    """Indices of n_out points chosen by Largest-Triangle-Three-Buckets
+
+    Keeps the first and last point; from each bucket in between keeps the point
+    forming the largest triangle with the previously kept point and the next
+    bucket's average, which preserves peaks, dips and slopes of a line.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    kept = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        following = slice(stop, edges[i + 2]) if i + 2 < len(edges) else slice(n - 1, n)
+        next_x, next_y = x[following].mean(), y[following].mean()
+        area = np.abs((x[kept] - next_x) * (y[start:stop] - y[kept])
+                      - (x[kept] - x[start:stop]) * (next_y - y[kept]))
+        kept = start + int(np.argmax(area))
+        selected[i + 1] = kept
+    return selected
+
+def min_max(y, n_out):
+    """Indices of the minimum and maximum of each of n_out // 2 equal buckets, in order
+
+    Every extreme survives, which suits bars and spiky series.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    buckets = n_out // 2
+    bucket = np.repeat(np.arange(buckets), np.diff(np.linspace(0, n, buckets + 1).astype(int)))
+    # Sorted by bucket, then value: each bucket's first entry is its minimum, its last the maximum
+    order = np.lexsort((y, bucket))
+    boundaries = np.flatnonzero(np.diff(bucket[order])) + 1
+    first = np.concatenate(([0], boundaries))
+    last = np.concatenate((boundaries - 1, [n - 1]))
+    return np.unique(np.concatenate((order[first], order[last])))
@@ -0,0 +1,195 @@
+"""Static export of every BU x month dashboard view to HTML and Plotly JSON.
+
+Renders the KPI tiles, each KPI's subdivision chart and the performance radar of
+every BU x month into <output>/<bu>/<month>/ (index.html plus a figures.json
+bundle), using the dashboard's own chart builders and metric formatting, spread
+across a process pool. A manifest of input fingerprints makes reruns
+incremental: only views whose data (or the export code) changed are rendered.
+
+    python export.py                          # export to ./static_export
+    python export.py --output /srv/kpi --workers 8
+    python export.py --source csv:/data/kpi --force
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Bump when the page layout changes so every view is rendered again
+EXPORT_VERSION = "1"
+MANIFEST = "manifest.json"
+# plotly.js CDN build, matched to the installed plotly.py (the version its specs are written for)
+PLOTLY_JS = "https://cdn.plot.ly/plotly-{version}.min.js"
+# Modules whose code shapes the output; their source is part of every fingerprint
+CODE_MODULES = ('charts.py', 'figure_json.py', 'kpi_registry.py', 'export.py')
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def plotly_js_version():
+    from plotly.offline import get_plotlyjs_version
+    return get_plotlyjs_version()
+
+def code_fingerprint():
+    # A plotly upgrade changes the specs and the runtime the pages load, so it re-renders every view
+    digest = hashlib.sha256(f"{EXPORT_VERSION}:{plotly_js_version()}".encode())
+    for name in CODE_MODULES:
+        with open(os.path.join(HERE, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def view_payloads(store, scores):
+    """One picklable payload per BU x month holding everything its page needs"""
+    for bu in store.bus:
+        for month in store.months:
+            yield {
+                'bu': bu,
+                'month': month,
+                'data': {category: {kpi: record.as_dict() for kpi, record in records.items()}
+                         for category, records in store.snapshot(bu, month).items()},
+                'radar': [scores.labels, list(scores.scores(bu, month))],
+            }
+
+def fingerprint(payload, code):
+    blob = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256((code + blob).encode()).hexdigest()[:16]
+
+def view_dir(bu, month):
+    return os.path.join(*(''.join(c if c.isalnum() or c in '-_' else '_' for c in part) for part in (bu, month)))
+
+def _write(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _delta_class(fields):
+    """CSS class mirroring st.metric's coloring of the delta: "up" green, "down" red"""
+    delta, color = fields['delta'], fields['delta_color']
+    if delta is None or color == 'off':
+        return 'off'
+    # "normal" shows a rise green, "inverse" shows a fall green
+    rising = not delta.startswith('-')
+    return 'up' if rising == (color == 'normal') else 'down'
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<script src="{plotly}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 24px; }}
+.tiles {{ display: flex; flex-wrap: wrap; gap: 12px; }}
+.tile {{ border: 1px solid #ddd; border-radius: 8px; padding: 10px 14px; min-width: 170px; }}
+.value {{ font-size: 26px; }} .up {{ color: #09ab3b; }} .down {{ color: #ff2b2b; }} .off {{ color: #808495; }}
+.charts {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(420px, 1fr)); }}
+</style></head>
+<body><h1>{title}</h1><p><a href="../../index.html">All views</a></p>
+{body}
+</body></html>
+"""
+
+def render_view(payload, output):
+    """Render one view's page and figure bundle; runs in a worker process"""
+    from charts import build_radar_chart, metric_fields, subdivision_spec
+    from figure_json import encode_figure
+    from kpi_registry import KPIS, SECTIONS
+
+    bu, month, data = payload['bu'], payload['month'], payload['data']
+    figures = {'radar': encode_figure(build_radar_chart(bu, *payload['radar']))}
+    parts = []
+    for section in SECTIONS:
+        tiles = []
+        for column in section.columns:
+            for name in column:
+                kpi = KPIS[name]
+                record = data[kpi.category][name]
+                fields = metric_fields(kpi.label, record['value'], kpi.unit, record['change'], kpi.icon)
+                delta = fields['delta'] or ''
+                tiles.append(
+                    f'<div class="tile"><div>{html.escape(fields["label"])}</div>'
+                    f'<div class="value">{html.escape(fields["value"])}</div>'
+                    f'<div class="{_delta_class(fields)}">{html.escape(delta)}</div></div>')
+                if record.get('subdivisions'):
+                    figures[kpi.slug] = subdivision_spec(kpi.name, record['subdivisions'], 'bar')
+        parts.append(f"<h2>{section.icon} {html.escape(section.title)}</h2><div class='tiles'>{''.join(tiles)}</div>")
+    encoded = {key: figure.json for key, figure in figures.items()}
+    # A "</script>" (or "<!--") in a label must not end the inline script: "<" only occurs
+    # inside JSON strings, where "\u003c" is the same character
+    inline = {key: spec.replace('<', '\\u003c') for key, spec in encoded.items()}
+    charts = ''.join(
+        f'<div id="{key}"></div><script>var f={spec};Plotly.newPlot("{key}",f.data,f.layout);</script>'
+        for key, spec in inline.items())
+    parts.append(f"<h2>📈 Charts</h2><div class='charts'>{charts}</div>")
+
+    directory = os.path.join(output, view_dir(bu, month))
+    os.makedirs(directory, exist_ok=True)
+    _write(os.path.join(directory, 'figures.json'),
+           '{' + ','.join(f'{json.dumps(key)}:{spec}' for key, spec in encoded.items()) + '}')
+    title = f"{bu} Performance · {month}"
+    _write(os.path.join(directory, 'index.html'),
+           PAGE.format(title=html.escape(title), plotly=PLOTLY_JS.format(version=plotly_js_version()), body='\n'.join(parts)))
+    return bu, month
+
+def write_index(output, views):
+    links = ''.join(f'<li><a href="{html.escape(view_dir(bu, month))}/index.html">'
+                    f'{html.escape(bu)} · {html.escape(month)}</a></li>' for bu, month in views)
+    _write(os.path.join(output, 'index.html'),
+           PAGE.format(title="KPI Performance Dashboard", plotly=PLOTLY_JS.format(version=plotly_js_version()), body=f"<ul>{links}</ul>")
+           .replace('<p><a href="../../index.html">All views</a></p>', ''))
+
+def load_manifest(output):
+    try:
+        with open(os.path.join(output, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='static_export', help="Output directory")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--source', help="KPI_SOURCE to export, e.g. csv:/data/kpi")
+    parser.add_argument('--seed', type=int, help="Sample data seed (KPI_DATA_SEED)")
+    parser.add_argument('--force', action='store_true', help="Render every view, even unchanged ones")
+    args = parser.parse_args(argv)
+
+    from kpi_cube import KPICube
+    from kpi_data import DATA_SEED, DATA_SOURCE, build_kpi_store
+    from kpi_scores import RadarScores
+
+    start = time.perf_counter()
+    store = build_kpi_store(DATA_SEED if args.seed is None else args.seed,
+                            DATA_SOURCE if args.source is None else args.source)
+    scores = RadarScores(store, KPICube(store))
+    os.makedirs(args.output, exist_ok=True)
+    manifest = {} if args.force else load_manifest(args.output)
+    code = code_fingerprint()
+
+    views, stale = [], []
+    for payload in view_payloads(store, scores):
+        key = f"{payload['bu']}/{payload['month']}"
+        views.append((payload['bu'], payload['month']))
+        digest = fingerprint(payload, code)
+        page = os.path.join(args.output, view_dir(payload['bu'], payload['month']), 'index.html')
+        if manifest.get(key) != digest or not os.path.exists(page):
+            stale.append((key, digest, payload))
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(stale)))) as pool:
+            futures = {pool.submit(render_view, payload, args.output): (key, digest)
+                       for key, digest, payload in stale}
+            for future in as_completed(futures):
+                future.result()
+                key, digest = futures[future]
+                # Recorded as each view lands, so an interrupted export resumes where it stopped
+                manifest[key] = digest
+                _write(os.path.join(args.output, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True))
+    write_index(args.output, views)
+    print(f"Rendered {len(stale)} of {len(views)} views to {args.output} "
+          f"in {time.perf_counter() - start:.1f}s ({len(views) - len(stale)} unchanged)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+
+class FigureCache:
+    """Bounded LRU cache of Plotly figures and their serialized JSON, with hit/miss counters
+
+    Keys must capture every chart input (KPI, data, chart type, theme, ...). Cached
+    figures are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> [figure, json or None]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entry
+
+    def _insert(self, key, figure):
+        entry = [figure, None]
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def get_json(self, key, build, encode=None):
+        """Serialized figure for key, calling build() only on a miss and encoding at most once per entry
+
+        encode(figure) does the serializing; by default the figure's own to_json().
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            # Built outside the lock; a concurrent miss on the same key just builds twice
+            entry = self._insert(key, build())
+        if entry[1] is None:
+            entry[1] = encode(entry[0]) if encode is not None else entry[0].to_json()
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
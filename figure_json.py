@@ -0,0 +1,171 @@
+"""Fast serialization of Plotly figures to the JSON spec plotly.js (and Streamlit) renders
+
+st.plotly_chart copies every figure into a dict and JSON-encodes it on every
+call, cached figure or not. Here a figure is encoded once into an
+EncodedFigure, which the figure cache keeps and st_plotly hands to the page
+as is. Charts of the same kind share a FigureTemplate: the layout, styling
+and trace boilerplate are encoded once, and each chart only encodes its own
+data arrays (as base64 NumPy buffers, plotly.js typed arrays) and title.
+Encoding uses orjson when it is installed, the json module otherwise.
+"""
+import base64
+import datetime
+import json
+import logging
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Marks the parts of a template filled in per chart; never appears in real figures
+HOLE = "__figure_json_hole_{}__"
+HOLE_PATTERN = re.compile(r'"__figure_json_hole_(\d+)__"')
+
+# NumPy dtypes plotly.js reads as typed arrays, by their plotly.js short names
+TYPED_ARRAYS = {
+    'int8': 'i1',
+    'uint8': 'u1',
+    'int16': 'i2',
+    'uint16': 'u2',
+    'int32': 'i4',
+    'uint32': 'u4',
+    'float32': 'f4',
+    'float64': 'f8',
+}
+
+@dataclass(frozen=True, slots=True)
+class EncodedFigure:
+    """A figure's JSON spec plus the layout height Streamlit sizes its element by"""
+    json: str
+    height: int | None
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        # NaN is not JSON; plotly.js reads null as a gap
+        return np.where(np.isnan(obj), None, obj).tolist() if obj.dtype.kind == 'f' else obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj):
+    """Compact JSON text of obj; NumPy arrays and scalars encode directly"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':'))
+
+# int64 has no plotly.js typed array; such arrays are narrowed to the first of these that fits
+NARROW_INTS = (np.int8, np.int16, np.int32)
+
+def typed_array(values):
+    """plotly.js typed array spec ({"dtype", "bdata"}) of a numeric array, or a list for anything else"""
+    array = np.asarray(values)
+    if array.dtype == np.int64 and array.size:
+        low, high = array.min(), array.max()
+        for candidate in NARROW_INTS:
+            if np.iinfo(candidate).min <= low and high <= np.iinfo(candidate).max:
+                array = array.astype(candidate)
+                break
+    dtype = TYPED_ARRAYS.get(array.dtype.name)
+    if dtype is None or array.size == 0:
+        return array.tolist()
+    return {'dtype': dtype, 'bdata': base64.b64encode(np.ascontiguousarray(array)).decode('ascii')}
+
+def encode_figure(figure):
+    """EncodedFigure of a Plotly figure (already encoded figures pass through)"""
+    if isinstance(figure, EncodedFigure):
+        return figure
+    spec = figure.to_dict()
+    return EncodedFigure(dumps(spec), spec['layout'].get('height'))
+
+class FigureTemplate:
+    """A figure encoded once, with holes where the parts that vary between charts go
+
+    fields are paths into the figure's dict, e.g. ('data', 0, 'y') or
+    ('layout', 'title', 'text'); fill() takes one value per field, in order, and
+    encodes only those. Numeric arrays go in as typed arrays.
+    """
+
+    def __init__(self, figure, fields):
+        spec = figure.to_dict()
+        for i, path in enumerate(fields):
+            node = spec
+            for key in path[:-1]:
+                node = node[key]
+            node[path[-1]] = HOLE.format(i)
+        self.fields = tuple(fields)
+        self.height = spec['layout'].get('height')
+        # Alternating literal JSON and hole numbers: [text, hole, text, hole, ..., text]
+        pieces = HOLE_PATTERN.split(dumps(spec))
+        self._text = pieces[0::2]
+        self._holes = [int(hole) for hole in pieces[1::2]]
+
+    def fill(self, *values):
+        """EncodedFigure with values in place of the template's fields"""
+        encoded = [dumps(typed_array(value) if isinstance(value, np.ndarray) else value) for value in values]
+        parts = [self._text[0]]
+        for hole, text in zip(self._holes, self._text[1:]):
+            parts += (encoded[hole], text)
+        return EncodedFigure(''.join(parts), self.height)
+
+# Cleared when building chart elements directly fails; st.plotly_chart is used from then on
+_direct_elements = True
+
+def _enqueue_plotly(figure, key):
+    """Enqueue a plotly_chart element for figure the way st.plotly_chart does (Streamlit 1.65 internals)"""
+    import streamlit as st
+    from streamlit.elements.lib.form_utils import current_form_id
+    from streamlit.elements.lib.layout_utils import LayoutConfig
+    from streamlit.elements.lib.utils import compute_and_register_element_id, to_key
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart
+
+    dg = st._main
+    proto = PlotlyChart()
+    proto.theme = 'streamlit'
+    proto.form_id = current_form_id(dg)
+    proto.spec = figure.json
+    proto.config = '{}'
+    height = figure.height or 450
+    proto.id = compute_and_register_element_id(
+        'plotly_chart',
+        user_key=to_key(key),
+        key_as_main_identity=False,
+        dg=dg,
+        plotly_spec=proto.spec,
+        plotly_config=proto.config,
+        selection_mode=('points', 'box', 'lasso'),
+        is_selection_activated=False,
+        theme='streamlit',
+        width='stretch',
+        height='content',
+        alt=None,
+    )
+    return dg._enqueue('plotly_chart', proto, layout_config=LayoutConfig(width='stretch', height=height))
+
+def st_plotly(figure, key=None):
+    """st.plotly_chart(..., width='stretch') for an EncodedFigure, without re-encoding it
+
+    Builds the same element st.plotly_chart would from the spec it already
+    has. If Streamlit's internals have moved (an import, attribute or
+    signature no longer matches), logs it once and falls back to
+    st.plotly_chart, which validates and re-encodes.
+    """
+    global _direct_elements
+    import streamlit as st
+
+    if _direct_elements:
+        try:
+            return _enqueue_plotly(figure, key)
+        except (ImportError, AttributeError, TypeError):
+            logger.warning("Building chart elements directly failed; falling back to st.plotly_chart",
+                           exc_info=True)
+            _direct_elements = False
+    return st.plotly_chart(json.loads(figure.json), width='stretch', key=key)
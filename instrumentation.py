@@ -0,0 +1,244 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Collect timings for every run (otherwise only for runs that ask for it, e.g. ?debug=1)
+ENABLED = os.environ.get("KPI_METRICS", "") not in ("", "0")
+# Directory for exported metrics; nothing is written when empty
+METRICS_DIR = os.environ.get("KPI_METRICS_DIR", "")
+# "jsonl", "prometheus" or "both"
+METRICS_FORMAT = os.environ.get("KPI_METRICS_FORMAT", "both")
+# Minimum seconds between rewrites of the Prometheus textfile
+METRICS_INTERVAL = float(os.environ.get("KPI_METRICS_INTERVAL", "15"))
+# Size at which the JSONL file is rotated, and rotated files kept (.1 newest); the oldest are deleted
+METRICS_MAX_MB = float(os.environ.get("KPI_METRICS_MAX_MB", "10"))
+METRICS_KEEP = int(os.environ.get("KPI_METRICS_KEEP", "5"))
+
+JSONL_FILE = "kpi_dashboard_runs.jsonl"
+PROMETHEUS_FILE = "kpi_dashboard.prom"
+
+class Metrics:
+    """Process-wide timer and counter aggregates shared by all sessions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timers = {}  # name -> [count, total seconds, max seconds]
+        self.counters = {}
+        self.runs = 0
+
+    def add_run(self, run):
+        with self._lock:
+            self.runs += 1
+            for name, (count, total, longest) in run.timers.items():
+                timer = self.timers.setdefault(name, [0, 0.0, 0.0])
+                timer[0] += count
+                timer[1] += total
+                timer[2] = max(timer[2], longest)
+            for name, value in run.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'timers': {name: list(timer) for name, timer in self.timers.items()},
+                'counters': dict(self.counters),
+            }
+
+metrics = Metrics()
+_local = threading.local()
+
+class RunRecorder:
+    """Timings and counters of a single script or fragment run"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, name, seconds):
+        timer = self.timers.get(name)
+        if timer is None:
+            self.timers[name] = [1, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    def increment(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+class _Timer:
+    __slots__ = ('run', 'name', 'start')
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.run.observe(self.name, time.perf_counter() - self.start)
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def start_run():
+    """Begin recording for the current thread's script run"""
+    _local.run = RunRecorder()
+    return _local.run
+
+def current_run():
+    return getattr(_local, 'run', None)
+
+def timed(name):
+    """Context manager timing a block into the current run; a no-op when not recording"""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return _NULL_TIMER
+    return _Timer(run, name)
+
+def increment(name, amount=1):
+    run = getattr(_local, 'run', None)
+    if run is not None:
+        run.increment(name, amount)
+
+def finish_run(gauges=None):
+    """Stop recording, fold the run into the process aggregates and export it
+
+    gauges is a callable returning the run's gauges, only called when a run was recorded.
+    """
+    run = getattr(_local, 'run', None)
+    _local.run = None
+    if run is None:
+        return None
+    run.observe('total', time.perf_counter() - run._start)
+    run.gauges = dict(gauges() if gauges else {})
+    metrics.add_run(run)
+    if METRICS_DIR:
+        export(run)
+    return run
+
+@contextmanager
+def record_run(enabled=True, gauges=None):
+    """Record the wrapped block as its own run unless a run is already active
+
+    Fragment reruns execute outside the full script run, so this lets them be
+    recorded on their own while staying part of the enclosing run otherwise.
+    gauges is a callable evaluated when the run finishes.
+    """
+    if not enabled or current_run() is not None:
+        yield current_run()
+        return
+    run = start_run()
+    try:
+        yield run
+    finally:
+        finish_run(gauges)
+
+def deep_sizeof(obj, _seen=None):
+    """Approximate bytes held by obj and the containers/arrays it references"""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    nbytes = getattr(obj, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+_export_lock = threading.Lock()
+_last_prometheus_write = 0.0
+
+def rotate(path, keep=METRICS_KEEP):
+    """Shift path to path.1, path.1 to path.2, ..., dropping what would go past path.<keep>"""
+    for n in range(keep, 0, -1):
+        source = f"{path}.{n - 1}" if n > 1 else path
+        if os.path.exists(source):
+            os.replace(source, f"{path}.{n}")
+    if keep < 1 and os.path.exists(path):
+        os.remove(path)
+
+def export(run):
+    global _last_prometheus_write
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    if METRICS_FORMAT in ("jsonl", "both"):
+        record = {
+            'ts': round(run.started, 3),
+            'timings_ms': {name: round(total * 1000, 3) for name, (_, total, _) in run.timers.items()},
+            'counts': {name: count for name, (count, _, _) in run.timers.items()},
+            'counters': run.counters,
+            'gauges': run.gauges,
+        }
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        path = os.path.join(METRICS_DIR, JSONL_FILE)
+        with _export_lock:
+            with open(path, 'a') as f:
+                f.write(line)
+                size = f.tell()
+            # One line per script and fragment run adds up on a busy server (run_every fragments)
+            if size > METRICS_MAX_MB * 1024 * 1024:
+                rotate(path)
+    if METRICS_FORMAT in ("prometheus", "both"):
+        with _export_lock:
+            now = time.monotonic()
+            if now - _last_prometheus_write < METRICS_INTERVAL:
+                return
+            _last_prometheus_write = now
+        write_prometheus(os.path.join(METRICS_DIR, PROMETHEUS_FILE), run.gauges)
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text(gauges=None):
+    """Process aggregates in the Prometheus text exposition format"""
+    snapshot = metrics.snapshot()
+    lines = [
+        "# HELP kpi_dashboard_runs_total Recorded script and fragment runs.",
+        "# TYPE kpi_dashboard_runs_total counter",
+        f"kpi_dashboard_runs_total {snapshot['runs']}",
+        "# HELP kpi_dashboard_block_seconds Time spent in instrumented blocks.",
+        "# TYPE kpi_dashboard_block_seconds summary",
+    ]
+    for name, (count, total, _) in sorted(snapshot['timers'].items()):
+        lines.append(f'kpi_dashboard_block_seconds_sum{{block="{_label(name)}"}} {total:.6f}')
+        lines.append(f'kpi_dashboard_block_seconds_count{{block="{_label(name)}"}} {count}')
+    lines += [
+        "# HELP kpi_dashboard_block_max_seconds Slowest single execution of an instrumented block.",
+        "# TYPE kpi_dashboard_block_max_seconds gauge",
+    ]
+    for name, (_, _, longest) in sorted(snapshot['timers'].items()):
+        lines.append(f'kpi_dashboard_block_max_seconds{{block="{_label(name)}"}} {longest:.6f}')
+    for name, value in sorted(snapshot['counters'].items()):
+        lines += [f"# TYPE kpi_dashboard_{name}_total counter", f"kpi_dashboard_{name}_total {value}"]
+    for name, value in sorted((gauges or {}).items()):
+        if isinstance(value, (int, float)):
+            lines += [f"# TYPE kpi_dashboard_{name} gauge", f"kpi_dashboard_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path, gauges=None):
+    """Atomically replace a textfile-collector file with the current aggregates"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(prometheus_text(gauges))
+    os.replace(tmp, path)
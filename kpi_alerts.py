@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from kpi_registry import ALERT_RULES
+from kpi_store import TOTAL
+
+# Weight of the newest point in the EWMA mean and variance
+ALERT_ALPHA = float(os.environ.get("KPI_ALERT_ALPHA", "0.3"))
+# A point more than this many EWMA standard deviations from the EWMA mean is anomalous
+ALERT_Z = float(os.environ.get("KPI_ALERT_Z", "3"))
+# Points a series needs before anomaly checks start
+ALERT_WARMUP = int(os.environ.get("KPI_ALERT_WARMUP", "3"))
+
+BREACH = 'breach'
+ANOMALY = 'anomaly'
+
+@dataclass(frozen=True, slots=True)
+class Alert:
+    """An active alert on one BU x KPI x subdivision series"""
+    bu: str
+    kpi: str
+    subdivision: str
+    kind: str  # BREACH or ANOMALY
+    value: float
+    expected: float  # the violated threshold, or the EWMA mean before the point
+    at: str  # month label, or arrival time of a streamed point
+
+    @property
+    def message(self):
+        where = self.kpi if self.subdivision == TOTAL else f"{self.kpi} ({self.subdivision})"
+        if self.kind == BREACH:
+            side = 'below' if self.value < self.expected else 'above'
+            return f"{where} {self.value:g} {side} threshold {self.expected:g}"
+        return f"{where} {self.value:g} deviates from its average {self.expected:.4g}"
+
+class AlertEngine:
+    """Threshold and EWMA anomaly alerts for every BU x KPI x subdivision series of a store
+
+    The store's history is folded in once, one vectorized step per month. After
+    that each new point updates its series' EWMA mean and variance and its alert
+    state in O(1), independent of how much history has been seen; the active
+    alerts are kept up to date alongside, so listing them never rescans.
+    """
+
+    def __init__(self, store, rules=ALERT_RULES, alpha=ALERT_ALPHA, z=ALERT_Z, warmup=ALERT_WARMUP):
+        self.alpha = alpha
+        self.z = z
+        self.warmup = warmup
+        self.bus = list(store.bus)
+        self.kpis = list(store.kpis)
+        self.subdivisions = list(store.subdivisions)
+        self._bu_index = dict(store._bu_index)
+        self._kpi_index = dict(store._kpi_index)
+        self._sub_index = dict(store._sub_index)
+        shape = store.values.shape[:1] + store.values.shape[2:]
+        self._minimum = np.full(len(self.kpis), -np.inf)
+        self._maximum = np.full(len(self.kpis), np.inf)
+        for rule in rules:
+            if rule.kpi in self._kpi_index:
+                k = self._kpi_index[rule.kpi]
+                if rule.minimum is not None:
+                    self._minimum[k] = rule.minimum
+                if rule.maximum is not None:
+                    self._maximum[k] = rule.maximum
+        self.mean = np.zeros(shape)
+        self.var = np.zeros(shape)
+        self.count = np.zeros(shape, dtype=np.int32)
+        self._lock = threading.Lock()
+        self._active = {}  # (b, k, s, kind) -> Alert
+        self._seed(store)
+
+    def _seed(self, store):
+        last = np.full(self.mean.shape, np.nan)
+        last_month = np.zeros(self.mean.shape, dtype=np.int32)
+        anomalous = np.zeros(self.mean.shape, dtype=bool)
+        expected = np.zeros(self.mean.shape)
+        for m in range(len(store.months)):
+            x = store.values[:, m].astype(np.float64)
+            present = ~np.isnan(x)
+            with np.errstate(invalid='ignore'):
+                deviation = np.abs(x - self.mean)
+                flagged = (self.count >= self.warmup) & (deviation > self.z * np.sqrt(self.var)) & (self.var > 0)
+            anomalous = np.where(present, flagged, anomalous)
+            expected = np.where(present, self.mean, expected)
+            last = np.where(present, x, last)
+            last_month = np.where(present, m, last_month)
+            self._update(x, present)
+        with np.errstate(invalid='ignore'):
+            breach = (last < self._minimum[:, None]) | (last > self._maximum[:, None])
+        for (b, k, s), threshold in zip(zip(*np.nonzero(breach)), self._threshold_array(last)[breach]):
+            self._raise(b, k, s, BREACH, last[b, k, s], threshold, store.months[last_month[b, k, s]])
+        for b, k, s in zip(*np.nonzero(anomalous)):
+            self._raise(b, k, s, ANOMALY, last[b, k, s], expected[b, k, s], store.months[last_month[b, k, s]])
+
+    def _threshold_array(self, values):
+        return np.where(values < self._minimum[:, None], self._minimum[:, None], self._maximum[:, None])
+
+    def _update(self, x, present):
+        """Vectorized EWMA step for the series where present"""
+        first = present & (self.count == 0)
+        diff = np.where(present, x - self.mean, 0)
+        increment = self.alpha * diff
+        self.mean = np.where(first, x, self.mean + increment)
+        self.var = np.where(first, 0, np.where(present, (1 - self.alpha) * (self.var + diff * increment), self.var))
+        self.count += present
+
+    def _raise(self, b, k, s, kind, value, expected, at):
+        self._active[b, k, s, kind] = Alert(self.bus[b], self.kpis[k], self.subdivisions[s], kind,
+                                            round(float(value), 4), round(float(expected), 4), at)
+
+    def observe(self, bu, kpi, value, subdivision=TOTAL, timestamp=None):
+        """Fold one new point into its series and update that series' alerts in O(1)
+
+        Points for series the store does not know are ignored.
+        """
+        try:
+            index = (self._bu_index[bu], self._kpi_index[kpi], self._sub_index[subdivision])
+        except KeyError:
+            return
+        b, k, s = index
+        at = time.strftime('%H:%M:%S', time.localtime(timestamp))
+        with self._lock:
+            mean, var, count = float(self.mean[index]), float(self.var[index]), int(self.count[index])
+            if value < self._minimum[k] or value > self._maximum[k]:
+                threshold = self._minimum[k] if value < self._minimum[k] else self._maximum[k]
+                self._raise(b, k, s, BREACH, value, threshold, at)
+            else:
+                self._active.pop((b, k, s, BREACH), None)
+            if count >= self.warmup and var > 0 and abs(value - mean) > self.z * var ** 0.5:
+                self._raise(b, k, s, ANOMALY, value, mean, at)
+            else:
+                self._active.pop((b, k, s, ANOMALY), None)
+            if count == 0:
+                self.mean[index], self.var[index] = value, 0.0
+            else:
+                diff = value - mean
+                increment = self.alpha * diff
+                self.mean[index] = mean + increment
+                self.var[index] = (1 - self.alpha) * (var + diff * increment)
+            self.count[index] = count + 1
+
+    def alerts(self, bu=None):
+        """Active alerts, breaches first, optionally of one BU"""
+        with self._lock:
+            alerts = list(self._active.values())
+        if bu is not None:
+            alerts = [alert for alert in alerts if alert.bu == bu]
+        return sorted(alerts, key=lambda alert: (alert.kind != BREACH, alert.bu, alert.kpi, alert.subdivision))
+
+    @property
+    def nbytes(self):
+        return self.mean.nbytes + self.var.nbytes + self.count.nbytes
@@ -0,0 +1,228 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from kpi_registry import KPIS, MEAN, SUM, WEIGHTED_MEAN
+from kpi_store import TOTAL, KPIMeta, KPIRecord
+
+# Row of the cube aggregating every BU
+ALL_BUS = 'All BUs'
+# Period covering the months of the latest year up to the latest month
+YTD = 'YTD'
+# BUs aggregated per vectorized step while building
+BU_CHUNK = 32
+
+def _month_dates(months):
+    """Parsed month labels, or None when they are not month names or YYYY-MM"""
+    for fmt in ('%B', '%b', '%Y-%m'):
+        parsed = pd.to_datetime(pd.Series(months, dtype=object), format=fmt, errors='coerce')
+        if len(months) and parsed.notna().all():
+            return parsed
+    return None
+
+def periods_for(months):
+    """(label, month indices) of every period: the months, their quarters, then YTD
+
+    Months are in calendar order, so every period is a contiguous run of months.
+    """
+    periods = [(month, [m]) for m, month in enumerate(months)]
+    dates = _month_dates(months)
+    if dates is None:
+        return periods
+    years = dates.dt.year.to_numpy()
+    multi_year = len(set(years)) > 1
+    quarters = {}
+    for m, (year, quarter) in enumerate(zip(years, dates.dt.quarter)):
+        label = f"{year}-Q{quarter}" if multi_year else f"Q{quarter}"
+        quarters.setdefault(label, []).append(m)
+    periods += list(quarters.items())
+    periods.append((YTD, [m for m, year in enumerate(years) if year == years[-1]]))
+    return periods
+
+class KPICube:
+    """Precomputed rollups over (BU + All BUs) x period (month, quarter, YTD) x KPI x subdivision
+
+    Keeps additive components (sum, count, weighted sum, weight) so a cell is
+    finalized with its KPI's sum, mean or weighted-mean semantics in O(1), and a
+    BU's rows can be rebuilt from the store when its data changes.
+    """
+
+    def __init__(self, store):
+        self.bus = list(store.bus) + [ALL_BUS]
+        self.kpis = list(store.kpis)
+        self.subdivisions = list(store.subdivisions)
+        self.units = dict(store.units)
+        self.targets = dict(store.targets)
+        self.categories = dict(store.categories)
+        self.months = list(store.months)
+        periods = periods_for(self.months)
+        self.periods = [label for label, _ in periods]
+        self.period_months = {label: [self.months[m] for m in members] for label, members in periods}
+        self._first = np.array([members[0] for _, members in periods])
+        self._last = np.array([members[-1] for _, members in periods])
+        # Previous period of the same kind (month, quarter), -1 where there is none
+        self._previous = np.full(len(periods), -1)
+        n_months, n_quarters = len(self.months), len(periods) - len(self.months) - 1
+        self._previous[1:n_months] = np.arange(n_months - 1)
+        if n_quarters > 1:
+            self._previous[n_months + 1:n_months + n_quarters] = np.arange(n_months, n_months + n_quarters - 1)
+        self._bu_index = {bu: i for i, bu in enumerate(self.bus)}
+        self._period_index = {period: i for i, period in enumerate(self.periods)}
+        self._kpi_index = {kpi: i for i, kpi in enumerate(self.kpis)}
+        self._sub_index = {sub: i for i, sub in enumerate(self.subdivisions)}
+        self._category_kpis = {}
+        for kpi in self.kpis:
+            self._category_kpis.setdefault(self.categories[kpi], []).append(kpi)
+        subdivisions = tuple(self.subdivisions[1:])
+        self._meta = {kpi: KPIMeta(kpi, self.categories[kpi], self.units[kpi], self.targets.get(kpi),
+                                   subdivisions, _scalars)
+                      for kpi in self.kpis}
+        how = [KPIS[kpi].aggregation if kpi in KPIS else MEAN for kpi in self.kpis]
+        self._sum = np.array([h == SUM for h in how])[:, None]
+        self._weight_kpi = np.array([
+            self._kpi_index.get(KPIS[kpi].weight, -1) if h == WEIGHTED_MEAN else -1
+            for kpi, h in zip(self.kpis, how)])
+        shape = (len(self.bus), len(self.periods), len(self.kpis), len(self.subdivisions))
+        self._components = np.empty((4,) + shape, dtype=store.values.dtype)
+        # A few BUs at a time bounds the temporaries at scale-test sizes
+        for start in range(0, len(store.bus), BU_CHUNK):
+            stop = min(start + BU_CHUNK, len(store.bus))
+            self._components[:, start:stop] = self._period_components(store.values[start:stop])
+        self._components[:, -1] = self._components[:, :-1].sum(axis=1)
+        self._shape = store.values.shape
+
+    def _period_components(self, values):
+        """sum, count, weighted sum and weight per period of a (bu, month, kpi, subdivision) array"""
+        present = ~np.isnan(values)
+        x = np.where(present, values, 0)
+        weights = np.where(self._weight_kpi[:, None] >= 0, x[..., self._weight_kpi, :], 0) * present
+        parts = np.stack([x, present.astype(x.dtype), x * weights, weights])
+        # Running totals over the months: a period is the difference at its two ends
+        running = np.zeros(parts.shape[:2] + (parts.shape[2] + 1,) + parts.shape[3:], dtype=x.dtype)
+        np.cumsum(parts, axis=2, out=running[:, :, 1:])
+        return running[:, :, self._last + 1] - running[:, :, self._first]
+
+    @property
+    def nbytes(self):
+        return self._components.nbytes
+
+    def update(self, store, bus=None):
+        """Rebuild the rows of the given BUs (all by default) from the store after new data arrived
+
+        Returns a fresh cube instead when the store's axes changed, and an updated
+        copy when this one is frozen.
+        """
+        if store.values.shape != self._shape or list(store.bus) != self.bus[:-1]:
+            return KPICube(store)
+        cube = self
+        if not self._components.flags.writeable:
+            # Shared with sessions still reading it: update a copy
+            cube = copy.copy(self)
+            cube._components = self._components.copy()
+        bus = store.bus if bus is None else bus
+        for bu in bus:
+            b = cube._bu_index[bu]
+            components = cube._period_components(store.values[b:b + 1])[:, 0]
+            cube._components[:, -1] += components - cube._components[:, b]
+            cube._components[:, b] = components
+        return cube
+
+    def _finalize(self, b, p):
+        """KPI x subdivision values of one BU/period under each KPI's aggregation"""
+        return _finalize(self._components[:, b, p], self._sum)
+
+    def totals(self, bu=None, period=None):
+        """BU-level values and changes of every BU x period x KPI, finalized in one vectorized step
+
+        Passing bu or period restricts the result to that BU's row or that
+        period's column, dropping the axis.
+        """
+        b = slice(None) if bu is None else slice(self._bu_index[bu], self._bu_index[bu] + 1)
+        if period is None:
+            values = _finalize(self._components[:, b, :, :, 0], self._sum[:, 0])
+            changes = np.full_like(values, np.nan)
+            has_previous = self._previous >= 0
+            before = values[:, self._previous[has_previous]]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                changes[:, has_previous] = (values[:, has_previous] - before) / np.abs(before) * 100
+        else:
+            p = self._period_index[period]
+            previous = self._previous[p]
+            # Only this period and the one before it need finalizing
+            values = _finalize(self._components[:, b, p:p + 1, :, 0], self._sum[:, 0])
+            changes = np.full_like(values, np.nan)
+            if previous >= 0:
+                before = _finalize(self._components[:, b, previous:previous + 1, :, 0], self._sum[:, 0])
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    changes = (values - before) / np.abs(before) * 100
+            values, changes = values[:, 0], changes[:, 0]
+        if bu is not None:
+            values, changes = values[0], changes[0]
+        return values, changes
+
+    def _cell(self, bu, period, kpi, subdivision):
+        b, p = self._bu_index[bu], self._period_index[period]
+        k, s = self._kpi_index[kpi], self._sub_index[subdivision]
+        return b, p, k, s
+
+    def _change(self, b, p, current):
+        previous = self._previous[p]
+        if previous < 0:
+            return np.full_like(current, np.nan)
+        before = self._finalize(b, previous)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (current - before) / np.abs(before) * 100
+
+    def is_base(self, bu, period):
+        """Whether bu/period is a single stored cell rather than an aggregate"""
+        return bu != ALL_BUS and period in self.months
+
+    # Lookup API, mirroring KPIStore's
+    def value(self, bu, period, kpi, subdivision=TOTAL):
+        b, p, k, s = self._cell(bu, period, kpi, subdivision)
+        return _scalar(self._finalize(b, p)[k, s])
+
+    def change(self, bu, period, kpi, subdivision=TOTAL):
+        """Percent change against the previous period of the same kind (None for YTD)"""
+        b, p, k, s = self._cell(bu, period, kpi, subdivision)
+        return _scalar(self._change(b, p, self._finalize(b, p))[k, s], digits=1)
+
+    def snapshot(self, bu, period):
+        """All KPIs of one BU/period grouped by category, in KPIStore.snapshot's shape"""
+        b, p = self._bu_index[bu], self._period_index[period]
+        values = self._finalize(b, p)
+        changes = self._change(b, p, values)
+        return {category: {kpi: KPIRecord(self._meta[kpi], _scalar(values[self._kpi_index[kpi], 0]),
+                                           _scalar(changes[self._kpi_index[kpi], 0], digits=1),
+                                           values[self._kpi_index[kpi], 1:])
+                           for kpi in kpis}
+                for category, kpis in self._category_kpis.items()}
+
+    def series(self, bu, kpi, subdivision=TOTAL):
+        """Aggregated values of one KPI across all months"""
+        b, _, k, s = self._cell(bu, self.months[0], kpi, subdivision)
+        return pd.Series([self._finalize(b, p)[k, s] for p in range(len(self.months))],
+                         index=self.months, name=kpi)
+
+    def subdivision_series(self, bu, kpi, subdivisions):
+        """Aggregated month x subdivision frame of one KPI, finalized in one step"""
+        b, k = self._bu_index[bu], self._kpi_index[kpi]
+        values = _finalize(self._components[:, b, :len(self.months), k], self._sum[k])
+        columns = [self._sub_index[sub] for sub in subdivisions]
+        return pd.DataFrame(values[:, columns], index=self.months, columns=list(subdivisions))
+
+def _finalize(components, is_sum):
+    """Values from (sum, count, weighted sum, weight) components; is_sum broadcasts over the KPI axis"""
+    total, count, weighted, weight = components
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        result = np.where(weight > 0, weighted / weight, mean)
+        result = np.where(is_sum, total, result)
+    return np.where(count > 0, result, np.nan)
+
+def _scalar(value, digits=2):
+    return None if np.isnan(value) else round(float(value), digits)
+
+def _scalars(values, digits=2):
+    return [round(value, digits) for value in values.tolist()]
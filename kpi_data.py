@@ -0,0 +1,247 @@
+import calendar
+import os
+import random
+
+import numpy as np
+import streamlit as st
+
+from data_sources import open_source
+from kpi_alerts import AlertEngine
+from kpi_cube import KPICube
+from kpi_history import KPIHistory
+from kpi_registry import KPI_DEFINITIONS
+from kpi_scores import RadarScores
+from kpi_store import KPIStore, freeze
+from kpi_stream import STREAM_SOURCE, open_stream
+
+# Data source settings. Bump DATA_VERSION whenever the generator or the
+# upstream extract changes shape so every process drops its cached copy.
+DATA_VERSION = "2"
+DATA_SEED = int(os.environ.get("KPI_DATA_SEED", "42"))
+DATA_TTL = os.environ.get("KPI_DATA_TTL", "1h")
+# Optional file-backed source, e.g. "csv:/data/kpi", "parquet:/data/kpi/*.parquet" or
+# "sqlite:/data/kpi.db#kpi_facts". "synthetic:<BUs>x<months>x<subdivisions>" (e.g.
+# "synthetic:500x120x50") generates a scale-test dataset. Empty means the sample generator.
+DATA_SOURCE = os.environ.get("KPI_SOURCE", "")
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June']
+BUSINESS_UNITS = ['BU1', 'BU2', 'BU3']
+SUBDIVISIONS = ['PRODEV', 'PD1', 'PD2', 'DOCS', 'ITS', 'CHAPTER']
+
+# Sample ranges per KPI: (low, high, divisor); values are randint(low, high) / divisor
+SAMPLE_RANGES = {
+    'Revenue': (25, 45, 10),
+    'Revenue vs Target': (85, 105, 1),
+    'Gross Margin': (30, 45, 1),
+    'Cost per Project': (35, 55, 1),
+    'AR Days': (25, 40, 1),
+    'CSAT': (40, 48, 10),
+    'NPS': (35, 55, 1),
+    'SLA Achievement': (85, 98, 1),
+    'Avg Response Time': (18, 30, 10),
+    'Retention Rate': (88, 96, 1),
+    'System Uptime': (9950, 9999, 100),
+    'Defect Rate': (8, 18, 10),
+    'Rework Rate': (25, 45, 10),
+    'Resolution Success': (94, 99, 1),
+    'Code Review Coverage': (85, 95, 1),
+    'Engagement Score': (70, 85, 10),
+    'Attrition Rate': (6, 12, 1),
+    'Training Hours': (35, 55, 1),
+    'Overtime per FTE': (25, 40, 10),
+    'Internal Promotion Rate': (8, 15, 1),
+}
+# Subdivision ranges where they differ from the KPI's own: (low, high, divisor)
+SUBDIVISION_RANGES = {
+    'Revenue': (20, 80, 1),
+    'CSAT': (35, 50, 10),
+    'System Uptime': (9900, 9999, 100),
+    'Engagement Score': (65, 90, 10),
+}
+TARGETS = {'Revenue vs Target': 100}
+# Largest month-to-month step of the sample random walks, as a fraction of the range
+WALK_STEP = 0.2
+
+def _scale(level, divisor):
+    return level if divisor == 1 else level / divisor
+
+def _walk(rng, low, high, steps):
+    """Bounded integer random walk of steps + 1 points within [low, high]"""
+    step = max(1, round((high - low) * WALK_STEP))
+    level = rng.randint(low, high)
+    points = [level]
+    for _ in range(steps):
+        level = min(high, max(low, level + rng.randint(-step, step)))
+        points.append(level)
+    return points
+
+def _percent_change(level, previous):
+    return round((level - previous) / abs(previous) * 100)
+
+# Sample data structure for KPIs
+def generate_kpi_data(seed=DATA_SEED):
+    """Generate sample KPI data for different BUs and subdivisions
+
+    Each KPI and subdivision follows a bounded random walk across the months, and
+    'change' is the percent change against the previous month (for the first month,
+    an unpublished warm-up month).
+    """
+    rng = random.Random(seed)
+    kpi_data = {bu: {month: {} for month in MONTHS} for bu in BUSINESS_UNITS}
+    for bu in BUSINESS_UNITS:
+        for kpi in KPI_DEFINITIONS:
+            low, high, divisor = SAMPLE_RANGES[kpi.name]
+            sub_low, sub_high, sub_divisor = SUBDIVISION_RANGES.get(kpi.name, SAMPLE_RANGES[kpi.name])
+            levels = _walk(rng, low, high, len(MONTHS))
+            sub_levels = {sub: _walk(rng, sub_low, sub_high, len(MONTHS)) for sub in SUBDIVISIONS}
+            for m, month in enumerate(MONTHS, 1):
+                record = {
+                    'value': _scale(levels[m], divisor),
+                    'unit': kpi.unit,
+                    'change': _percent_change(levels[m], levels[m - 1]),
+                    'subdivisions': {sub: _scale(points[m], sub_divisor) for sub, points in sub_levels.items()},
+                }
+                if kpi.name in TARGETS:
+                    record['target'] = TARGETS[kpi.name]
+                kpi_data[bu][month].setdefault(kpi.category, {})[kpi.name] = record
+    return kpi_data
+
+def synthetic_labels(n_bus, n_months, n_subdivisions):
+    """BU, month and subdivision labels for a synthetic dataset of the given size"""
+    bus = [f'BU{i}' for i in range(1, n_bus + 1)]
+    if n_months <= 12:
+        months = list(calendar.month_name[1:n_months + 1])
+    else:
+        months = [f'{2020 + i // 12}-{i % 12 + 1:02d}' for i in range(n_months)]
+    subdivisions = SUBDIVISIONS[:n_subdivisions] + [
+        f'SUB{i:02d}' for i in range(len(SUBDIVISIONS) + 1, n_subdivisions + 1)]
+    return bus, months, subdivisions
+
+def random_walks(rng, low, high, shape):
+    """Bounded integer random walks along axis 1 (months), vectorized over the other axes
+
+    low and high broadcast against shape without its month axis.
+    """
+    step = np.maximum(1, np.round((high - low) * WALK_STEP)).astype(np.int16)
+    levels = np.empty(shape, dtype=np.int16)
+    # int16 keeps the temporaries small; every range fits comfortably
+    levels[:, 0] = rng.integers(low, high + 1, size=levels[:, 0].shape, dtype=np.int16)
+    for m in range(1, shape[1]):
+        levels[:, m] = np.clip(levels[:, m - 1] + rng.integers(-step, step + 1, size=levels[:, m].shape,
+                                                               dtype=np.int16), low, high)
+    return levels
+
+def generate_synthetic_store(n_bus=3, n_months=6, n_subdivisions=6, seed=DATA_SEED, dtype=np.float32):
+    """Generate a seeded sample dataset of any size in one vectorized pass
+
+    Every KPI gets a BU-level value and change plus a value per subdivision, each a
+    random walk over the months within its SAMPLE_RANGES bounds, with the change
+    derived from the previous month. float32 halves memory at scale-test sizes.
+    """
+    kpis = [kpi.name for kpi in KPI_DEFINITIONS]
+    bus, months, subdivisions = synthetic_labels(n_bus, n_months, n_subdivisions)
+    store = KPIStore.empty(
+        bus, months, kpis, subdivisions,
+        categories={kpi.name: kpi.category for kpi in KPI_DEFINITIONS},
+        units={kpi.name: kpi.unit for kpi in KPI_DEFINITIONS},
+        targets=TARGETS,
+        dtype=dtype,
+    )
+    rng = np.random.default_rng(seed)
+    low, high, divisor = (np.array(column) for column in zip(*(SAMPLE_RANGES[kpi] for kpi in kpis)))
+    sub_low, sub_high, sub_divisor = (
+        np.array(column)[:, None] for column in zip(*(SUBDIVISION_RANGES.get(kpi, SAMPLE_RANGES[kpi])
+                                                   for kpi in kpis)))
+    # One warm-up month in front so the first month's change is defined too
+    levels = random_walks(rng, low, high, (n_bus, n_months + 1, len(kpis)))
+    store.values[..., 0] = levels[:, 1:] / divisor
+    with np.errstate(divide='ignore', invalid='ignore'):
+        store.changes[..., 0] = np.rint((levels[:, 1:] - levels[:, :-1]) / np.abs(levels[:, :-1]) * 100)
+    del levels
+    sub_levels = random_walks(rng, sub_low, sub_high, (n_bus, n_months + 1, len(kpis), n_subdivisions))
+    np.divide(sub_levels[:, 1:], sub_divisor, out=store.values[..., 1:], casting='unsafe')
+    store.integral = frozenset(
+        [('value', kpi) for kpi, d in zip(kpis, divisor) if d == 1]
+        + [('subdivision', kpi) for kpi, d in zip(kpis, sub_divisor[:, 0]) if d == 1]
+        + [('change', kpi) for kpi in kpis])
+    return store
+
+def parse_synthetic_spec(spec):
+    """(n_bus, n_months, n_subdivisions) from a "<BUs>x<months>x<subdivisions>" spec"""
+    try:
+        n_bus, n_months, n_subdivisions = (int(part) for part in spec.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"Invalid synthetic source {spec!r}; expected e.g. 'synthetic:500x120x50'") from None
+    return n_bus, n_months, n_subdivisions
+
+def build_kpi_store(seed=DATA_SEED, source=DATA_SOURCE):
+    """Load the KPI dataset without any caching, e.g. for batch jobs outside Streamlit"""
+    if source.startswith('synthetic:'):
+        return generate_synthetic_store(*parse_synthetic_spec(source.partition(':')[2]), seed=seed)
+    if source:
+        return open_source(source).refresh()
+    return KPIStore.from_nested(generate_kpi_data(seed))
+
+@st.cache_resource(show_spinner=False)
+def get_kpi_source(spec):
+    """Process-wide source instance, so its incremental state survives cache refreshes"""
+    return open_source(spec)
+
+@st.cache_resource(ttl=DATA_TTL, show_spinner="Loading KPI data...")
+def load_kpi_store(version=DATA_VERSION, seed=DATA_SEED, source=DATA_SOURCE):
+    """Load the KPI dataset once per process, keyed on source version and seed
+
+    Like everything derived from it below, the store is a read-only resource shared
+    by every session: no per-viewer copies, and sources copy before writing.
+    """
+    if source and not source.startswith('synthetic:'):
+        # Only partitions/rows that changed since the last load are read
+        return freeze(get_kpi_source(source).refresh())
+    return freeze(build_kpi_store(seed, source))
+
+@st.cache_resource(ttl=DATA_TTL, show_spinner=False)
+def load_kpi_history(version=DATA_VERSION, seed=DATA_SEED, source=DATA_SOURCE):
+    """MoM change, rolling/YTD averages and trends of the dataset, derived once per load"""
+    return freeze(KPIHistory(load_kpi_store(version, seed, source)))
+
+@st.cache_resource(ttl=DATA_TTL, show_spinner=False)
+def load_kpi_cube(version=DATA_VERSION, seed=DATA_SEED, source=DATA_SOURCE):
+    """BU x period rollups of the dataset, for All BUs, quarter and YTD views"""
+    store = load_kpi_store(version, seed, source)
+    if source and not source.startswith('synthetic:'):
+        # Maintained incrementally by the source as new rows arrive
+        return freeze(get_kpi_source(source).cube)
+    return freeze(KPICube(store))
+
+@st.cache_resource(ttl=DATA_TTL, show_spinner=False)
+def load_radar_scores(version=DATA_VERSION, seed=DATA_SEED, source=DATA_SOURCE):
+    """Performance radar scores of every BU x period, normalized once per load"""
+    return freeze(RadarScores(load_kpi_store(version, seed, source), load_kpi_cube(version, seed, source)))
+
+@st.cache_resource(show_spinner=False)
+def get_kpi_stream(spec=STREAM_SOURCE):
+    """Process-wide live stream (see kpi_stream), started on first use; None when disabled"""
+    if not spec:
+        return None
+    return open_stream(spec, load_kpi_store())
+
+@st.cache_resource(ttl=DATA_TTL, show_spinner=False)
+def load_alert_engine(version=DATA_VERSION, seed=DATA_SEED, source=DATA_SOURCE):
+    """Alert engine seeded from the dataset and, when streaming, fed every live point
+
+    Unlike the resources above it keeps changing (under its own lock) as points arrive.
+    """
+    engine = AlertEngine(load_kpi_store(version, seed, source))
+    stream = get_kpi_stream()
+    if stream is not None:
+        # Replaces the engine of a previous load, so only the current one is fed
+        stream.listener = engine.observe
+    return engine
+
+def refresh_kpi_data():
+    """Drop the cached dataset so the next read loads it again"""
+    load_kpi_store.clear()
+    load_kpi_history.clear()
+    load_kpi_cube.clear()
+    load_radar_scores.clear()
+    load_alert_engine.clear()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from kpi_store import TOTAL
+
+# Trailing window, in months, of the rolling average
+ROLLING_WINDOW = 3
+
+def _year_ids(months):
+    """Year of each month label so YTD restarts every January; plain month names are one year"""
+    parsed = pd.to_datetime(pd.Series(months), format='%Y-%m', errors='coerce')
+    if len(months) and parsed.notna().all():
+        return parsed.dt.year.to_numpy()
+    return np.zeros(len(months), dtype=int)
+
+def _running(values):
+    """NaN-aware cumulative sums and counts along the month axis"""
+    present = ~np.isnan(values)
+    sums = np.cumsum(np.where(present, values, 0), axis=1, dtype=values.dtype)
+    counts = np.cumsum(present, axis=1, dtype=np.int32)
+    return sums, counts
+
+def _mean(sums, counts):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (sums / counts).astype(sums.dtype, copy=False)
+
+def trailing_mean(values, window=ROLLING_WINDOW):
+    """Mean of the last `window` months (fewer at the start), skipping missing months"""
+    sums, counts = _running(values)
+    if window < values.shape[1]:
+        sums[:, window:] = sums[:, window:] - sums[:, :-window]
+        counts[:, window:] = counts[:, window:] - counts[:, :-window]
+    return _mean(sums, counts)
+
+def year_to_date_mean(values, years):
+    """Mean from the first month of each month's year up to and including it"""
+    sums, counts = _running(values)
+    before = np.searchsorted(years, years, side='left') - 1
+    first = (before < 0).reshape(1, -1, *([1] * (values.ndim - 2)))
+    sums -= np.where(first, 0, sums[:, before])
+    counts -= np.where(first, 0, counts[:, before])
+    return _mean(sums, counts)
+
+class KPIHistory:
+    """Month-over-month change, rolling and YTD averages and trend for every cell of a KPIStore
+
+    Computed in one vectorized pass over the store's (bu, month, kpi, subdivision)
+    arrays; lookups are plain indexing afterwards.
+    """
+
+    def __init__(self, store, window=ROLLING_WINDOW):
+        self.window = window
+        self._bu_index = dict(store._bu_index)
+        self._month_index = dict(store._month_index)
+        self._kpi_index = dict(store._kpi_index)
+        self._sub_index = dict(store._sub_index)
+        # Percent change against the previous month
+        self.mom = store.month_over_month()
+        self.rolling = trailing_mean(store.values, window)
+        self.ytd = year_to_date_mean(store.values, _year_ids(store.months))
+        # Month-to-month movement of the rolling average
+        self.trend = np.full_like(self.rolling, np.nan)
+        self.trend[:, 1:] = np.diff(self.rolling, axis=1)
+
+    @property
+    def nbytes(self):
+        return self.mom.nbytes + self.rolling.nbytes + self.ytd.nbytes + self.trend.nbytes
+
+    def summary(self, bu, month, kpi, subdivision=TOTAL):
+        """mom, rolling, ytd and trend of one cell, None where undefined"""
+        index = (self._bu_index[bu], self._month_index[month],
+                 self._kpi_index[kpi], self._sub_index[subdivision])
+        return {
+            name: None if np.isnan(array[index]) else float(array[index])
+            for name, array in (('mom', self.mom), ('rolling', self.rolling),
+                                ('ytd', self.ytd), ('trend', self.trend))
+        }
@@ -0,0 +1,83 @@
+"""Dense KPI x BU (or KPI x month) grid for the dashboard's matrix mode
+
+One st.dataframe replaces the page's metric tiles. KPIs are the columns, so
+each gets its unit formatter in a single Styler.format call and thousands of
+BUs stay a scrollable list of rows; the coloring of every cell's change is
+computed for the whole grid at once with the same direction rules as the tiles.
+"""
+import numpy as np
+import pandas as pd
+
+from kpi_registry import HIGHER_IS_BETTER, KPI_DEFINITIONS
+
+# Matrix rows: every BU for the selected period, or every month of the selected BU
+ACROSS_BUS = 'BUs'
+ACROSS_MONTHS = 'Months'
+# Cell contents
+SHOW_VALUES = 'Values'
+SHOW_CHANGES = 'Change'
+
+# Text colors of a change st.metric shows as good/bad (see export._delta_class)
+UP_STYLE = 'color: #09ab3b'
+DOWN_STYLE = 'color: #ff2b2b'
+
+def matrix_data(store, cube, bu, period, across=ACROSS_BUS):
+    """KPI definitions plus (values, changes) frames with a row per BU or month and a column per KPI
+
+    Stored cells come from the store, as on the tiles; aggregates (All BUs,
+    quarters, YTD) from the cube.
+    """
+    kpis = [kpi for kpi in KPI_DEFINITIONS if kpi.name in store._kpi_index]
+    columns = [cube.kpis.index(kpi.name) for kpi in kpis]
+    if across == ACROSS_MONTHS:
+        rows = list(store.months)
+        if bu in store._bu_index:
+            b = store._bu_index[bu]
+            values, changes = store.values[b, :, :, 0], store.changes[b, :, :, 0]
+        else:
+            values, changes = cube.totals(bu=bu)
+            values, changes = values[:len(rows)], changes[:len(rows)]
+    else:
+        rows = list(cube.bus)
+        values, changes = cube.totals(period=period)
+        if period in store._month_index:
+            m = store._month_index[period]
+            values = np.concatenate([store.values[:, m, :, 0], values[-1:]])
+            changes = np.concatenate([store.changes[:, m, :, 0], changes[-1:]])
+    index = pd.Index(rows, name='Month' if across == ACROSS_MONTHS else 'BU')
+    labels = [f"{kpi.icon} {kpi.label}" for kpi in kpis]
+    frames = [pd.DataFrame(np.asarray(array, dtype=float)[:, columns], index=index, columns=labels)
+              for array in (values, changes)]
+    return kpis, frames[0], frames[1]
+
+def change_styles(kpis, changes):
+    """CSS per cell coloring its change the way st.metric colors the KPI's delta
+
+    Vectorized form of kpi_registry.delta_color plus st.metric's rendering of it:
+    a change in the KPI's better direction is green, one in the other direction
+    red; no direction or no change leaves the cell uncolored.
+    """
+    directions = np.array([kpi.direction for kpi in kpis], dtype=object)[None, :]
+    change = changes.to_numpy()
+    with np.errstate(invalid='ignore'):
+        improved = np.where(directions == HIGHER_IS_BETTER, change > 0, change < 0)
+        colored = (directions != None) & (change != 0) & ~np.isnan(change)  # noqa: E711
+    styles = np.where(improved, UP_STYLE, DOWN_STYLE)
+    return pd.DataFrame(np.where(colored, styles, ''), index=changes.index, columns=changes.columns)
+
+def _value_formatter(kpi, integral):
+    def format_cell(value):
+        if integral and float(value).is_integer():
+            value = int(value)
+        return kpi.format(value)
+    return format_cell
+
+def style_matrix(store, kpis, values, changes, show=SHOW_VALUES):
+    """Styler rendering values (or changes) with per-KPI formatting and change coloring"""
+    frame = values if show == SHOW_VALUES else changes
+    styles = change_styles(kpis, changes)
+    styler = frame.style.apply(lambda _: styles, axis=None)
+    if show == SHOW_CHANGES:
+        return styler.format('{:+.1f}%', na_rep='–')
+    return styler.format({label: _value_formatter(kpi, ('value', kpi.name) in store.integral)
+                          for kpi, label in zip(kpis, frame.columns)}, na_rep='–')
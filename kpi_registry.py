@@ -0,0 +1,344 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+HIGHER_IS_BETTER = 'higher'
+LOWER_IS_BETTER = 'lower'
+
+# How a KPI rolls up across BUs and months
+SUM = 'sum'
+MEAN = 'mean'
+WEIGHTED_MEAN = 'weighted_mean'  # weighted by the KPI named in KPIDefinition.weight
+
+def format_value(value, unit):
+    """Format a KPI value for display based on its unit"""
+    if isinstance(value, float):
+        if unit in ['M', 'K']:
+            return f"${value:.1f}{unit}"
+        elif unit == '%':
+            return f"{value:.1f}%"
+        elif unit == '/5':
+            return f"{value:.1f}/5"
+        elif unit == '/10':
+            return f"{value:.1f}/10"
+        elif unit == 'h':
+            return f"{value:.1f}h"
+        else:
+            return f"{value:.1f}{unit}"
+    return f"{value}{unit}"
+
+def delta_color(direction, change):
+    """st.metric delta color for a change, given whether higher or lower is better
+
+    st.metric applies the sign itself: "normal" shows a rise green and a fall
+    red, "inverse" the opposite, so only the KPI's direction picks the mode.
+    """
+    if direction is None or change == 0:
+        return "off"
+    return "normal" if direction == HIGHER_IS_BETTER else "inverse"
+
+@dataclass(frozen=True)
+class SubdivisionTab:
+    """One subdivision tab of a drill-down: a metric tile plus the subdivision's trend chart"""
+    subdivision: str
+    chart_type: str = 'line'
+
+@dataclass(frozen=True)
+class DrillDown:
+    """Contents of a KPI's details expander
+
+    Either a set of subdivision tabs, or (with chart_selector set) a single chart of
+    the KPI across all subdivisions with a chart-type selectbox under that key.
+    """
+    heading: str
+    metric_label: str = ''
+    chart_title: str = ''
+    chart_key: str = ''
+    tabs: tuple = ()
+    chart_selector: Optional[str] = None
+    icon: Optional[str] = None  # expander icon, when it differs from the KPI's
+    subdivision_format: Optional[str] = None  # str.format pattern, defaults to the KPI's formatter
+
+@dataclass(frozen=True)
+class KPIDefinition:
+    """Display metadata for one KPI"""
+    name: str  # key in the dataset
+    category: str
+    unit: str
+    icon: str
+    direction: Optional[str]
+    label: Optional[str] = None  # metric title, defaults to name
+    formatter: Optional[Callable] = None  # (value, unit) -> str, defaults to format_value
+    drilldown: Optional[DrillDown] = None
+    aggregation: str = MEAN
+    weight: Optional[str] = None  # weighting KPI for WEIGHTED_MEAN
+
+    def __post_init__(self):
+        if self.label is None:
+            object.__setattr__(self, 'label', self.name)
+
+    @property
+    def slug(self):
+        return self.name.lower().replace(' ', '_')
+
+    def format(self, value):
+        return (self.formatter or format_value)(value, self.unit)
+
+@dataclass(frozen=True)
+class RadarAxis:
+    """One axis of the performance radar: score = offset + scale * field, capped at cap"""
+    label: str
+    kpi: str
+    scale: float = 1
+    offset: float = 0
+    field: str = 'value'  # 'value' or 'change'
+    absolute: bool = False  # score the magnitude of the field
+    cap: Optional[float] = None
+
+@dataclass(frozen=True)
+class AlertRule:
+    """Threshold of a KPI: a value below minimum or above maximum raises an alert"""
+    kpi: str
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+@dataclass(frozen=True)
+class Section:
+    """A dashboard section: a heading and columns of KPI names"""
+    title: str
+    icon: str
+    widths: tuple
+    columns: tuple
+
+KPI_DEFINITIONS = (
+    KPIDefinition('Revenue', 'Financial', 'M', '💰', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Revenue Breakdown by Subdivision', metric_label='Revenue',
+                      chart_title='Revenue', chart_key='revenue',
+                      subdivision_format='${}K',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'bar'),
+                          SubdivisionTab('PD1', 'line'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                          SubdivisionTab('ITS'),
+                          SubdivisionTab('CHAPTER'),
+                      )),
+                  aggregation=SUM),
+    KPIDefinition('Revenue vs Target', 'Financial', '%', '🎯', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Subdivision Breakdown', metric_label='Target Achievement',
+                      chart_title='Revenue vs Target', chart_key='target',
+                      icon='💰',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      )),
+                  aggregation=WEIGHTED_MEAN, weight='Revenue'),
+    KPIDefinition('Gross Margin', 'Financial', '%', '📊', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Margin Analysis by Subdivision', metric_label='Margin',
+                      chart_title='Margin Trend', chart_key='margin',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                      )),
+                  aggregation=WEIGHTED_MEAN, weight='Revenue'),
+    KPIDefinition('Cost per Project', 'Financial', 'K', '💸', LOWER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Cost Breakdown by Subdivision', metric_label='Cost',
+                      chart_title='Cost Trend', chart_key='cost',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                      ))),
+    KPIDefinition('AR Days', 'Financial', 'days', '📅', LOWER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'AR Days by Subdivision', metric_label='AR Days',
+                      chart_title='AR Days', chart_key='ar',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                      ))),
+    KPIDefinition('CSAT', 'Customer & Service', '/5', '⭐', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Customer Satisfaction by Subdivision', metric_label='CSAT',
+                      chart_title='CSAT', chart_key='csat',
+                      subdivision_format='{:.1f}/5',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('NPS', 'Customer & Service', '', '📈', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Net Promoter Score by Subdivision', metric_label='NPS',
+                      chart_title='NPS', chart_key='nps',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('SLA Achievement', 'Customer & Service', '%', '🎯', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'SLA Achievement by Subdivision', metric_label='SLA',
+                      chart_title='SLA', chart_key='sla',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('Avg Response Time', 'Customer & Service', 'h', '⏱️', LOWER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Average Response Time by Subdivision', metric_label='Avg Response',
+                      chart_title='Response Time', chart_key='response',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('Retention Rate', 'Customer & Service', '%', '🔒', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Customer Retention by Subdivision', metric_label='Retention',
+                      chart_title='Retention Rate', chart_key='retention',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('System Uptime', 'Quality Metrics', '%', '⚡', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(heading='System Uptime by Subdivision', chart_selector='uptime_chart')),
+    KPIDefinition('Defect Rate', 'Quality Metrics', '%', '🔍', LOWER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Defect Rate by Subdivision', metric_label='Defect Rate',
+                      chart_title='Defect Rate', chart_key='defect',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('Rework Rate', 'Quality Metrics', '%', '🔄', LOWER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Rework Rate by Subdivision', metric_label='Rework Rate',
+                      chart_title='Rework Rate', chart_key='rework',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('Resolution Success', 'Quality Metrics', '%', '✅', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Resolution Success by Subdivision', metric_label='Resolution',
+                      chart_title='Resolution', chart_key='resolution',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('Code Review Coverage', 'Quality Metrics', '%', '📝', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Code Review Coverage by Subdivision', metric_label='Code Review',
+                      chart_title='Code Review', chart_key='review',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('Engagement Score', 'Employee Fulfillment', '/10', '👨\u200d💼', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(heading='Employee Engagement by Subdivision', chart_selector='engagement_chart')),
+    KPIDefinition('Attrition Rate', 'Employee Fulfillment', '%', '📉', LOWER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Attrition Rate by Subdivision', metric_label='Attrition',
+                      chart_title='Attrition', chart_key='attrition',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('Training Hours', 'Employee Fulfillment', 'hrs', '📚', HIGHER_IS_BETTER,
+                  label='Training Hours/Emp',
+                  drilldown=DrillDown(
+                      'Training Hours per Employee by Subdivision', metric_label='Training',
+                      chart_title='Training', chart_key='training',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('Overtime per FTE', 'Employee Fulfillment', 'h', '⏰', LOWER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Overtime per FTE by Subdivision', metric_label='Overtime',
+                      chart_title='Overtime', chart_key='overtime',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+    KPIDefinition('Internal Promotion Rate', 'Employee Fulfillment', '%', '🎖️', HIGHER_IS_BETTER,
+                  drilldown=DrillDown(
+                      'Internal Promotion Rate by Subdivision', metric_label='Promotion',
+                      chart_title='Promotion Rate', chart_key='promotion',
+                      tabs=(
+                          SubdivisionTab('PRODEV', 'line'),
+                          SubdivisionTab('PD1', 'bar'),
+                          SubdivisionTab('PD2'),
+                          SubdivisionTab('DOCS'),
+                      ))),
+)
+
+SECTIONS = (
+    Section('Financial', '📊', (1, 1, 1), (
+        ('Revenue vs Target', 'Cost per Project'),
+        ('Gross Margin', 'AR Days'),
+        ('Revenue',),
+    )),
+    Section('Customer & Service', '👥', (1, 1, 1), (
+        ('NPS', 'Avg Response Time'),
+        ('SLA Achievement', 'Retention Rate'),
+        ('CSAT',),
+    )),
+    Section('Quality Metrics', '🎯', (2, 1, 1), (
+        ('System Uptime',),
+        ('Defect Rate', 'Rework Rate'),
+        ('Resolution Success', 'Code Review Coverage'),
+    )),
+    Section('Employee Fulfillment', '👨‍💼', (2, 1, 1), (
+        ('Engagement Score',),
+        ('Attrition Rate', 'Training Hours'),
+        ('Overtime per FTE', 'Internal Promotion Rate'),
+    )),
+)
+
+# Performance radar axes, each normalized onto 0-100
+RADAR_AXES = (
+    RadarAxis('Revenue Performance', 'Revenue vs Target', cap=100),
+    RadarAxis('Customer Satisfaction', 'CSAT', scale=20),  # 4.5/5 -> 90
+    RadarAxis('Quality Score', 'System Uptime'),
+    RadarAxis('Employee Engagement', 'Engagement Score', scale=10),  # 8.5/10 -> 85
+    RadarAxis('Operational Efficiency', 'Defect Rate', scale=-10, offset=100),  # inverted
+    RadarAxis('Cost Management', 'Cost per Project', scale=-1, offset=100, field='change', absolute=True),
+)
+
+# Threshold alerts; every KPI is also watched for anomalous moves (see kpi_alerts)
+ALERT_RULES = (
+    AlertRule('SLA Achievement', minimum=90),
+    AlertRule('System Uptime', minimum=99.5),
+    AlertRule('Attrition Rate', maximum=10),
+)
+
+# O(1) lookups by dataset name and by display label
+KPIS = {kpi.name: kpi for kpi in KPI_DEFINITIONS}
+KPIS_BY_LABEL = {kpi.label: kpi for kpi in KPI_DEFINITIONS}
@@ -0,0 +1,46 @@
+import numpy as np
+
+from kpi_registry import RADAR_AXES
+
+def normalize(values, changes, kpi_index, axes=RADAR_AXES):
+    """Radar scores (..., axis) from (..., kpi) value and change arrays, NaN where a KPI is missing"""
+    scores = np.full(values.shape[:-1] + (len(axes),), np.nan)
+    for i, axis in enumerate(axes):
+        if axis.kpi not in kpi_index:
+            continue
+        field = values if axis.field == 'value' else changes
+        x = field[..., kpi_index[axis.kpi]].astype(np.float64)
+        if axis.absolute:
+            x = np.abs(x)
+        score = axis.offset + axis.scale * x
+        if axis.cap is not None:
+            score = np.minimum(score, axis.cap)
+        scores[..., i] = score
+    return scores
+
+class RadarScores:
+    """Performance radar scores of every BU x period, normalized once per dataset load
+
+    Single BU/month cells are scored from the store, All BUs, quarters and YTD from
+    the rollup cube, matching what the rest of the dashboard shows for them.
+    """
+
+    def __init__(self, store, cube, axes=RADAR_AXES):
+        self.labels = [axis.label for axis in axes]
+        self._store_scores = normalize(store.values[..., 0], store.changes[..., 0], store._kpi_index, axes)
+        self._cube_scores = normalize(*cube.totals(), cube._kpi_index, axes)
+        self._store_cells = {(bu, month): (b, m) for b, bu in enumerate(store.bus)
+                             for m, month in enumerate(store.months)}
+        self._cube_cells = {(bu, period): (b, p) for b, bu in enumerate(cube.bus)
+                            for p, period in enumerate(cube.periods)}
+
+    @property
+    def nbytes(self):
+        return self._store_scores.nbytes + self._cube_scores.nbytes
+
+    def scores(self, bu, period):
+        """Scores of one BU/period as a tuple, None where undefined"""
+        cell = self._store_cells.get((bu, period))
+        row = self._store_scores[cell] if cell is not None else self._cube_scores[self._cube_cells[bu, period]]
+        # Rounded so float32 storage noise doesn't leak into labels or cache keys
+        return tuple(None if np.isnan(score) else round(float(score), 4) for score in row)
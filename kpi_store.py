@@ -0,0 +1,329 @@
+import sys
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Subdivision label used for the BU-level figure of a KPI
+TOTAL = 'Total'
+# Fields whose integer-ness is tracked per KPI so lookups hand back ints where the source had ints
+INTEGRAL_FIELDS = ('value', 'subdivision', 'change')
+# Columns identifying one cell of the store in the long-format schema
+KEY_COLUMNS = ['bu', 'month', 'kpi', 'subdivision']
+
+def _labels(column):
+    """Axis labels of a frame column: categorical order if present, else first-appearance order"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return list(column.cat.categories)
+    return list(pd.unique(column))
+
+def _month_labels(column):
+    """Month labels in calendar order when they parse as dates or month names"""
+    labels = _labels(column)
+    if isinstance(column.dtype, pd.CategoricalDtype) and column.cat.ordered:
+        return labels
+    for fmt in ('%B', '%b', None):
+        parsed = pd.to_datetime(pd.Series(labels), format=fmt, errors='coerce')
+        if parsed.notna().all():
+            return [labels[i] for i in np.argsort(parsed.to_numpy(), kind='stable')]
+    return labels
+
+@dataclass(frozen=True, slots=True)
+class KPIMeta:
+    """Metadata of one KPI, created once per store and shared by all of its records"""
+    name: str
+    category: str
+    unit: str
+    target: Optional[float]
+    subdivisions: tuple  # subdivision axis labels, TOTAL excluded
+    subdivision_scalars: Callable  # array of present values -> Python ints/floats, as the owning store reports them
+
+@dataclass(frozen=True, slots=True)
+class KPIRecord:
+    """One KPI observation of a BU/period
+
+    Unit, target and subdivision labels live once on the shared KPIMeta; the
+    subdivision values are a view of the owner's array row (read-only once frozen).
+    """
+    meta: KPIMeta
+    value: object
+    change: object
+    subdivision_row: np.ndarray
+
+    @property
+    def unit(self):
+        return self.meta.unit
+
+    @property
+    def target(self):
+        return self.meta.target
+
+    @property
+    def subdivisions(self):
+        """Mapping subdivision -> value for the populated subdivisions"""
+        present = ~np.isnan(self.subdivision_row)
+        labels = (sub for sub, keep in zip(self.meta.subdivisions, present.tolist()) if keep)
+        return dict(zip(labels, self.meta.subdivision_scalars(self.subdivision_row[present])))
+
+    def as_dict(self):
+        """The plain dict layout of generate_kpi_data, e.g. for serialization"""
+        record = {'value': self.value, 'unit': self.unit, 'change': self.change}
+        subdivisions = self.subdivisions
+        if subdivisions:
+            record['subdivisions'] = subdivisions
+        if self.target is not None:
+            record['target'] = self.target
+        return record
+
+def freeze(obj):
+    """Mark the NumPy array attributes of obj read-only so it can be shared across sessions"""
+    for value in vars(obj).values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return obj
+
+class KPIStore:
+    """Columnar KPI storage: dense value/change arrays over (bu, month, kpi, subdivision)"""
+
+    def __init__(self, bus, months, kpis, subdivisions, values, changes,
+                 categories, units, targets=None, integral=()):
+        self.bus = list(bus)
+        self.months = list(months)
+        self.kpis = list(kpis)
+        # TOTAL always sits at position 0 of the subdivision axis
+        self.subdivisions = [TOTAL] + [sub for sub in subdivisions if sub != TOTAL]
+        self.values = values
+        self.changes = changes
+        self.categories = dict(categories)
+        self.units = dict(units)
+        self.targets = dict(targets or {})
+        self.integral = frozenset(integral)
+        self._bu_index = {bu: i for i, bu in enumerate(self.bus)}
+        self._month_index = {month: i for i, month in enumerate(self.months)}
+        self._kpi_index = {kpi: i for i, kpi in enumerate(self.kpis)}
+        self._sub_index = {sub: i for i, sub in enumerate(self.subdivisions)}
+        self._category_kpis = {}
+        for kpi in self.kpis:
+            self._category_kpis.setdefault(self.categories[kpi], []).append(kpi)
+        self._meta = None
+
+    @classmethod
+    def empty(cls, bus, months, kpis, subdivisions, categories, units,
+              targets=None, integral=(), dtype=np.float64):
+        """Create a store with every cell missing (NaN)"""
+        shape = (len(bus), len(months), len(kpis), len(subdivisions) + 1)
+        return cls(bus, months, kpis, subdivisions,
+                   np.full(shape, np.nan, dtype=dtype), np.full(shape, np.nan, dtype=dtype),
+                   categories, units, targets, integral)
+
+    @classmethod
+    def from_nested(cls, kpi_data, dtype=np.float64):
+        """Build a store from the nested bu -> month -> category -> kpi dict layout"""
+        bus = list(kpi_data)
+        months = list(kpi_data[bus[0]])
+        categories, units, targets = {}, {}, {}
+        subdivisions = []
+        non_integral = set()
+        for category, kpis in kpi_data[bus[0]][months[0]].items():
+            for kpi, record in kpis.items():
+                categories[kpi] = category
+                units[kpi] = record['unit']
+                if 'target' in record:
+                    targets[kpi] = record['target']
+                for sub in record.get('subdivisions', {}):
+                    if sub not in subdivisions:
+                        subdivisions.append(sub)
+        store = cls.empty(bus, months, list(categories), subdivisions, categories, units,
+                          targets, dtype=dtype)
+        for b, bu in enumerate(bus):
+            for m, month in enumerate(months):
+                for kpis in kpi_data[bu][month].values():
+                    for kpi, record in kpis.items():
+                        k = store._kpi_index[kpi]
+                        store.values[b, m, k, 0] = record['value']
+                        store.changes[b, m, k, 0] = record['change']
+                        for field, value in (('value', record['value']), ('change', record['change'])):
+                            if not isinstance(value, int):
+                                non_integral.add((field, kpi))
+                        for sub, value in record.get('subdivisions', {}).items():
+                            store.values[b, m, k, store._sub_index[sub]] = value
+                            if not isinstance(value, int):
+                                non_integral.add(('subdivision', kpi))
+        store.integral = frozenset((field, kpi) for field in INTEGRAL_FIELDS for kpi in store.kpis
+                                   if (field, kpi) not in non_integral)
+        return store
+
+    @classmethod
+    def from_frame(cls, frame, dtype=np.float64):
+        """Build a store from a long-format frame (see to_frame for the schema)"""
+        frame = frame.drop_duplicates(KEY_COLUMNS, keep='last')
+        meta = frame.drop_duplicates('kpi')
+        categories = dict(zip(meta['kpi'], meta['category']))
+        units = dict(zip(meta['kpi'], meta['unit'].fillna('')))
+        targets = {}
+        if 'target' in frame:
+            targets = {kpi: target for kpi, target in zip(meta['kpi'], meta['target']) if pd.notna(target)}
+        subdivisions = [sub for sub in _labels(frame['subdivision']) if sub != TOTAL]
+        store = cls.empty(_labels(frame['bu']), _month_labels(frame['month']), list(categories),
+                          subdivisions, categories, units, targets, dtype=dtype)
+        store.update_frame(frame)
+        whole = frame.assign(
+            value=np.mod(frame['value'], 1) == 0,
+            change=np.mod(frame['change'], 1) == 0 if 'change' in frame else False,
+            level=np.where(frame['subdivision'] == TOTAL, 'value', 'subdivision'),
+        )
+        integral = set()
+        for (kpi, level), group in whole.groupby(['kpi', 'level'], observed=True):
+            if group['value'].all():
+                integral.add((level, kpi))
+            if level == 'value' and group['change'].all():
+                integral.add(('change', kpi))
+        store.integral = frozenset(integral)
+        return store
+
+    def update_frame(self, frame):
+        """Write the rows of a long-format frame into the arrays in one vectorized scatter"""
+        b = pd.Index(self.bus).get_indexer(frame['bu'])
+        m = pd.Index(self.months).get_indexer(frame['month'])
+        k = pd.Index(self.kpis).get_indexer(frame['kpi'])
+        s = pd.Index(self.subdivisions).get_indexer(frame['subdivision'])
+        self.values[b, m, k, s] = frame['value'].to_numpy(dtype=self.values.dtype)
+        if 'change' in frame:
+            self.changes[b, m, k, s] = frame['change'].to_numpy(dtype=self.changes.dtype)
+
+    def copy(self):
+        return KPIStore(self.bus, self.months, self.kpis, self.subdivisions,
+                        self.values.copy(), self.changes.copy(), self.categories, self.units,
+                        self.targets, self.integral)
+
+    def merge_frame(self, frame):
+        """Apply new rows in place, rebuilding only when they introduce unseen labels
+
+        A frozen (shared) store is copied first and the copy returned, so sessions
+        still reading it never see a half-applied update.
+        """
+        axes = (('bu', self._bu_index), ('month', self._month_index),
+                ('kpi', self._kpi_index), ('subdivision', self._sub_index))
+        if all(set(frame[col].unique()) <= index.keys() for col, index in axes):
+            store = self if self.values.flags.writeable else self.copy()
+            store.update_frame(frame)
+            return store
+        return KPIStore.from_frame(pd.concat([self.to_frame(), frame], ignore_index=True),
+                                   dtype=self.values.dtype)
+
+    def to_frame(self):
+        """Long-format frame with categorical dtypes, one row per populated cell"""
+        b, m, k, s = np.nonzero(~np.isnan(self.values))
+        kpi_categories = [self.categories[kpi] for kpi in self.kpis]
+        kpi_units = [self.units[kpi] for kpi in self.kpis]
+        kpi_targets = np.array([self.targets.get(kpi, np.nan) for kpi in self.kpis], dtype=float)
+        return pd.DataFrame({
+            'bu': pd.Categorical.from_codes(b, self.bus),
+            'month': pd.Categorical.from_codes(m, self.months, ordered=True),
+            'category': pd.Categorical(np.asarray(kpi_categories, dtype=object)[k]),
+            'kpi': pd.Categorical.from_codes(k, self.kpis),
+            'subdivision': pd.Categorical.from_codes(s, self.subdivisions),
+            'value': self.values[b, m, k, s],
+            'change': self.changes[b, m, k, s],
+            'unit': pd.Categorical(np.asarray(kpi_units, dtype=object)[k]),
+            'target': kpi_targets[k],
+        })
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.changes.nbytes
+
+    def _scalar(self, field, kpi, value):
+        if np.isnan(value):
+            return None
+        if (field, kpi) in self.integral:
+            return int(value)
+        # str() gives the shortest round-trip repr, so float32 4.3 comes back as 4.3
+        return float(value) if self.values.dtype == np.float64 else float(str(value))
+
+    def _scalars(self, field, kpi, values):
+        """_scalar over an array without missing values, in one conversion"""
+        if (field, kpi) in self.integral:
+            return values.astype(np.int64).tolist()
+        if self.values.dtype == np.float64:
+            return values.tolist()
+        return [float(str(value)) for value in values]
+
+    def _index(self, bu, month, kpi, subdivision=TOTAL):
+        return (self._bu_index[bu], self._month_index[month],
+                self._kpi_index[kpi], self._sub_index[subdivision])
+
+    # Lookup API
+    def value(self, bu, month, kpi, subdivision=TOTAL):
+        field = 'value' if subdivision == TOTAL else 'subdivision'
+        return self._scalar(field, kpi, self.values[self._index(bu, month, kpi, subdivision)])
+
+    def change(self, bu, month, kpi, subdivision=TOTAL):
+        return self._scalar('change', kpi, self.changes[self._index(bu, month, kpi, subdivision)])
+
+    def subdivision_values(self, bu, month, kpi):
+        """Mapping subdivision -> value for the populated subdivisions of a KPI"""
+        b, m, k, _ = self._index(bu, month, kpi)
+        row = self.values[b, m, k, 1:]
+        return {sub: self._scalar('subdivision', kpi, v) for sub, v in zip(self.subdivisions[1:], row) if not np.isnan(v)}
+
+    @property
+    def meta(self):
+        """KPIMeta per KPI, built on first use (integral flags are final by then)"""
+        if self._meta is None:
+            subdivisions = tuple(self.subdivisions[1:])
+            self._meta = {
+                kpi: KPIMeta(sys.intern(kpi), sys.intern(self.categories[kpi]), sys.intern(self.units[kpi]),
+                             self.targets.get(kpi), subdivisions,
+                             lambda values, kpi=kpi: self._scalars('subdivision', kpi, values))
+                for kpi in self.kpis
+            }
+        return self._meta
+
+    def kpi(self, bu, month, kpi):
+        """Record for one KPI of a BU/month"""
+        b, m, k, _ = self._index(bu, month, kpi)
+        return KPIRecord(self.meta[kpi],
+                         self._scalar('value', kpi, self.values[b, m, k, 0]),
+                         self._scalar('change', kpi, self.changes[b, m, k, 0]),
+                         self.values[b, m, k, 1:])
+
+    def snapshot(self, bu, month):
+        """All KPIs of one BU/month grouped by category"""
+        return {category: {kpi: self.kpi(bu, month, kpi) for kpi in kpis}
+                for category, kpis in self._category_kpis.items()}
+
+    # Vectorized slices and rollups
+    def series(self, bu, kpi, subdivision=TOTAL):
+        """Values of one KPI across all months"""
+        b, _, k, s = self._index(bu, self.months[0], kpi, subdivision)
+        return pd.Series(self.values[b, :, k, s], index=self.months, name=kpi)
+
+    def subdivision_series(self, bu, kpi, subdivisions):
+        """Month x subdivision frame of one KPI"""
+        b, _, k, _ = self._index(bu, self.months[0], kpi)
+        columns = [self._sub_index[sub] for sub in subdivisions]
+        return pd.DataFrame(self.values[b, :, k][:, columns], index=self.months, columns=list(subdivisions))
+
+    def cross_section(self, month, subdivision=TOTAL):
+        """BU x KPI frame for one month"""
+        m, s = self._month_index[month], self._sub_index[subdivision]
+        return pd.DataFrame(self.values[:, m, :, s], index=self.bus, columns=self.kpis)
+
+    def rollup(self, axis='bu', how='mean', subdivision=TOTAL):
+        """Aggregate over BUs or months, returning a (remaining axis) x KPI frame"""
+        s = self._sub_index[subdivision]
+        cube = self.values[..., s]
+        reducer = {'mean': np.nanmean, 'sum': np.nansum, 'min': np.nanmin, 'max': np.nanmax}[how]
+        if axis == 'bu':
+            return pd.DataFrame(reducer(cube, axis=0), index=self.months, columns=self.kpis)
+        return pd.DataFrame(reducer(cube, axis=1), index=self.bus, columns=self.kpis)
+
+    def month_over_month(self):
+        """Percent change against the previous month for every cell (NaN for the first month)"""
+        previous = self.values[:, :-1]
+        delta = np.full_like(self.values, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta[:, 1:] = (self.values[:, 1:] - previous) / np.abs(previous) * 100
+        return delta
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+
+import numpy as np
+
+from kpi_store import TOTAL
+
+# Live point source: "file:<path>" (JSON lines, followed like tail -f), "udp:<host>:<port>"
+# (one JSON point per datagram) or "simulate" (a random walk from the latest stored values).
+# Empty disables streaming.
+STREAM_SOURCE = os.environ.get("KPI_STREAM", "")
+# Points kept per BU x KPI; the oldest are overwritten first
+STREAM_CAPACITY = int(os.environ.get("KPI_STREAM_CAPACITY", "300"))
+# How often the live tiles rerun (a run_every interval, e.g. "2s")
+STREAM_REFRESH = os.environ.get("KPI_STREAM_REFRESH", "2s")
+# Seconds between simulated points and between polls of a followed file
+STREAM_INTERVAL = float(os.environ.get("KPI_STREAM_INTERVAL", "1"))
+
+# KPIs fed by the stream; points for other KPIs are dropped
+STREAM_KPIS = ('System Uptime', 'SLA Achievement', 'Avg Response Time')
+
+logger = logging.getLogger(__name__)
+
+class RingBuffer:
+    """Fixed-capacity buffer of (timestamp, value) points; appends overwrite the oldest"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._times = np.empty(capacity)
+        self._values = np.empty(capacity)
+        self._next = 0
+        self._size = 0
+        # Bumped on every append so readers can tell whether anything arrived
+        self.version = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, value):
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.version += 1
+
+    def points(self):
+        """(times, values) copies in arrival order"""
+        order = np.arange(self._next - self._size, self._next) % self.capacity
+        return self._times[order], self._values[order]
+
+class KPIStream:
+    """Ring buffers of live points per (BU, KPI), filled by a background thread
+
+    Points are dicts with "bu", "kpi", "value" and optional "ts" (epoch seconds,
+    defaulting to arrival time) and "subdivision" (defaulting to the BU total;
+    only totals are buffered). Readers take copies under the lock, so a rerun
+    never sees a buffer mid-append. Every accepted point is also passed to
+    listener(bu, kpi, value, subdivision, timestamp), e.g. an alert engine.
+    """
+
+    def __init__(self, capacity=STREAM_CAPACITY, kpis=STREAM_KPIS):
+        self.capacity = capacity
+        self.kpis = frozenset(kpis)
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.received = 0
+        self.dropped = 0
+        self.listener = None
+
+    def append(self, point):
+        try:
+            key = (str(point['bu']), point['kpi'])
+            value = float(point['value'])
+            timestamp = float(point.get('ts') or time.time())
+            subdivision = str(point.get('subdivision') or TOTAL)
+        except (KeyError, TypeError, ValueError):
+            key = None
+        with self._lock:
+            if key is None or key[1] not in self.kpis:
+                self.dropped += 1
+                return
+            if subdivision == TOTAL:
+                buffer = self._buffers.get(key)
+                if buffer is None:
+                    buffer = self._buffers[key] = RingBuffer(self.capacity)
+                buffer.append(timestamp, value)
+            self.received += 1
+        listener = self.listener
+        if listener is not None:
+            listener(*key, value, subdivision, timestamp)
+
+    def window(self, bu, kpi):
+        """(version, times, values) of one BU x KPI, or None before its first point"""
+        with self._lock:
+            buffer = self._buffers.get((bu, kpi))
+            if buffer is None:
+                return None
+            return (buffer.version, *buffer.points())
+
+    def start(self, points):
+        """Consume an iterable of points on a daemon thread"""
+        def run():
+            try:
+                for point in points:
+                    if self._stop.is_set():
+                        break
+                    self.append(point)
+            except Exception:
+                logger.exception("KPI stream stopped")
+        self._thread = threading.Thread(target=run, name="kpi-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+def _parse(line):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return {}
+
+def follow_file(path, interval=STREAM_INTERVAL):
+    """Points from a JSON-lines file: its existing lines, then whatever gets appended"""
+    while not os.path.exists(path):
+        time.sleep(interval)
+    with open(path, encoding='utf-8') as f:
+        pending = ''
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                time.sleep(interval)
+                continue
+            pending += chunk
+            # A writer may be mid-line; wait for the newline before parsing
+            if pending.endswith('\n'):
+                if pending.strip():
+                    yield _parse(pending)
+                pending = ''
+
+def receive_datagrams(host, port):
+    """Points sent as UDP datagrams, one JSON object each (a stand-in for a message socket)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind((host, port))
+        while True:
+            data, _ = sock.recvfrom(65536)
+            yield _parse(data.decode('utf-8', errors='replace'))
+
+def simulate(store, kpis=STREAM_KPIS, interval=STREAM_INTERVAL, seed=None):
+    """Random-walk points around each BU's latest stored value of the streamed KPIs"""
+    rng = random.Random(seed)
+    month = store.months[-1]
+    levels = {(bu, kpi): store.value(bu, month, kpi) for bu in store.bus for kpi in kpis
+              if kpi in store.kpis}
+    levels = {key: level for key, level in levels.items() if level is not None}
+    while True:
+        now = time.time()
+        for (bu, kpi), level in levels.items():
+            level = max(0.0, level * (1 + rng.gauss(0, 0.002)))
+            if store.units[kpi] == '%':
+                level = min(level, 100.0)
+            levels[bu, kpi] = level
+            yield {'ts': now, 'bu': bu, 'kpi': kpi, 'value': round(level, 3)}
+        time.sleep(interval)
+
+def open_stream(spec, store):
+    """Start a KPIStream from a "file:<path>", "udp:<host>:<port>" or "simulate" spec"""
+    kind, _, target = spec.partition(':')
+    if kind == 'file':
+        points = follow_file(target)
+    elif kind == 'udp':
+        host, _, port = target.rpartition(':')
+        points = receive_datagrams(host or '127.0.0.1', int(port))
+    elif kind == 'simulate':
+        points = simulate(store)
+    else:
+        raise ValueError(f"Unknown KPI stream {spec!r}; expected file:<path>, udp:<host>:<port> or simulate")
+    return KPIStream().start(points)
@@ -0,0 +1,105 @@
+import cProfile
+import os
+import re
+import tempfile
+import threading
+import time
+
+# Profile runs without the query parameter: "cprofile" or "pyinstrument" (still rate limited)
+PROFILE_MODE = os.environ.get("KPI_PROFILE", "")
+# Directory profiles are written to
+PROFILE_DIR = os.environ.get("KPI_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "kpi_dashboard_profiles"))
+# Number of profiles kept on disk and their total size cap; the oldest are deleted first
+PROFILE_KEEP = int(os.environ.get("KPI_PROFILE_KEEP", "20"))
+PROFILE_MAX_MB = float(os.environ.get("KPI_PROFILE_MAX_MB", "50"))
+# Minimum seconds between two profiled runs in this process
+PROFILE_INTERVAL = float(os.environ.get("KPI_PROFILE_INTERVAL", "30"))
+# pyinstrument sampling interval in seconds
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("KPI_PROFILE_SAMPLE_INTERVAL", "0.001"))
+
+PROFILERS = {'cprofile': '.prof', 'pyinstrument': '.html'}
+
+# Only one run is profiled at a time, so profiling never stacks up across sessions
+_lock = threading.Lock()
+_last_profile = float('-inf')
+
+def requested_mode(query_value=None):
+    """Profiler to use for this run from ?profile=... or KPI_PROFILE, or None"""
+    value = (query_value or PROFILE_MODE).lower()
+    if value in ('1', 'true'):
+        return 'cprofile'
+    return value if value in PROFILERS else None
+
+def _acquire():
+    """Claim the profiling slot unless it is busy or a profile ran within PROFILE_INTERVAL"""
+    global _last_profile
+    if not _lock.acquire(blocking=False):
+        return False
+    now = time.monotonic()
+    if now - _last_profile < PROFILE_INTERVAL:
+        _lock.release()
+        return False
+    _last_profile = now
+    return True
+
+def profile_path(mode, label=''):
+    label = re.sub(r'[^A-Za-z0-9_-]+', '-', label).strip('-')
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    name = f"{stamp}-{os.getpid()}-{label}" if label else f"{stamp}-{os.getpid()}"
+    return os.path.join(PROFILE_DIR, name + PROFILERS[mode])
+
+def prune():
+    """Delete the oldest profiles beyond PROFILE_KEEP files or PROFILE_MAX_MB in total"""
+    entries = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.is_file() and entry.name.endswith(tuple(PROFILERS.values())):
+            stat = entry.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    entries.sort(reverse=True)
+    budget = PROFILE_MAX_MB * 1024 * 1024
+    total = 0
+    for kept, (_, size, path) in enumerate(entries):
+        total += size
+        if kept >= PROFILE_KEEP or total > budget:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def profile_call(func, mode, label=''):
+    """Call func() under the profiler and write the profile to PROFILE_DIR
+
+    Returns the profile path, or None when the run was not profiled because
+    another profile is in progress or ran too recently; func() runs either way.
+    pyinstrument falls back to cProfile when it is not installed.
+    """
+    if not _acquire():
+        func()
+        return None
+    try:
+        if mode == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                mode = 'cprofile'
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = profile_path(mode, label)
+        if mode == 'pyinstrument':
+            profiler = Profiler(interval=PROFILE_SAMPLE_INTERVAL)
+            profiler.start()
+            try:
+                func()
+            finally:
+                profiler.stop()
+                with open(path, 'w') as f:
+                    f.write(profiler.output_html())
+        else:
+            profiler = cProfile.Profile()
+            try:
+                profiler.runcall(func)
+            finally:
+                profiler.dump_stats(path)
+        prune()
+        return path
+    finally:
+        _lock.release()
@@ -0,0 +1,66 @@
+"""Warm start for a dashboard replica: preload everything, then serve.
+
+Before the Streamlit server starts, renders the landing view of every business
+unit once, headlessly and in this same process: the app's modules get imported,
+the KPI data, history, cube, scores and alerts are loaded into the shared
+resource caches, and the landing view's figures (every drill-down of the first
+BU included, which also loads Plotly's templates) land in the figure cache.
+The first viewer of a new replica then gets a warm render. Finally runs
+`streamlit run dashboard.py` in-process, passing any arguments through.
+
+    python serve.py                           # warm up, then serve
+    python serve.py --server.port 8080        # arguments go to streamlit run
+    KPI_WARMUP=0 python serve.py              # serve without warming up
+"""
+import os
+import sys
+import time
+
+# Set to 0 to start serving right away
+WARMUP = os.environ.get("KPI_WARMUP", "1") not in ("", "0")
+# Seconds allowed for each warm-up render
+WARMUP_TIMEOUT = float(os.environ.get("KPI_WARMUP_TIMEOUT", "300"))
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+
+def render(timeout, **state):
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(APP, default_timeout=timeout)
+    for key, value in state.items():
+        app.session_state[key] = value
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return app
+
+def warm_up(timeout=WARMUP_TIMEOUT):
+    """Render the landing view of every BU; returns the number of views rendered"""
+    # Eager drill-downs, so every chart a viewer can open on the landing page is built
+    app = render(timeout, lazy_drilldowns=False)
+    bus = app.radio(key='bu').options
+    for bu in bus[1:]:
+        render(timeout, bu=bu)
+    return len(bus)
+
+def main(argv=None):
+    from streamlit.web import bootstrap, cli
+
+    argv = sys.argv[1:] if argv is None else argv
+    context = cli.main_run.make_context('serve.py', [APP, *argv])
+    # Load the server's own config (flags included) first, so warming up does not pre-empt it
+    bootstrap.load_config_options({name: value for name, value in context.params.items()
+                                   if name not in ('target', 'args')})
+    if WARMUP:
+        start = time.perf_counter()
+        try:
+            views = warm_up()
+        except Exception as exc:
+            # A cold replica is still better than none
+            print(f"Warm-up failed, serving cold: {exc}", file=sys.stderr)
+        else:
+            print(f"Warmed up {views} views in {time.perf_counter() - start:.1f}s")
+    with context:
+        return cli.main_run.invoke(context)
+
+if __name__ == "__main__":
+    sys.exit(main())